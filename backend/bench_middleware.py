@@ -0,0 +1,112 @@
+"""
+Накладные расходы стека middleware на запрос (/api/health и /api/stops).
+
+Запуск (нужна БД с пользователем --user-id, сервер не требуется):
+    python bench_middleware.py [--requests 2000] [--user-id 1]
+
+Запросы идут напрямую в ASGI-приложение через httpx.ASGITransport
+в трёх вариантах стека:
+    none       — без пользовательских middleware (только CORS и обработчики ошибок)
+    asgi       — текущий стек (чистые ASGI middleware)
+    base_http  — текущий стек + по слою BaseHTTPMiddleware на каждый
+                 middleware: стоимость прежней реализации на BaseHTTPMiddleware
+Overhead — разница медиан с вариантом none. Лимиты RateLimitMiddleware
+на время замера поднимаются, иначе запросы упрутся в 429.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from core.security import create_access_token
+from main import app
+from middleware import AuthMiddleware, LoggingMiddleware, RateLimitMiddleware, SecurityMiddleware
+
+
+CUSTOM_MIDDLEWARE = (AuthMiddleware, LoggingMiddleware, RateLimitMiddleware, SecurityMiddleware)
+BENCH_LIMIT = 10 ** 9
+
+
+class PassThroughMiddleware(BaseHTTPMiddleware):
+    """Пустой слой BaseHTTPMiddleware: задача и memory stream на запрос"""
+
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def _stack(mode: str) -> List[Middleware]:
+    stack = []
+    for m in app.user_middleware:
+        if m.cls in CUSTOM_MIDDLEWARE and mode == "none":
+            continue
+        if m.cls is RateLimitMiddleware:
+            options = {**m.kwargs, "default_limit": BENCH_LIMIT, "login_limit": BENCH_LIMIT,
+                       "upload_limit": BENCH_LIMIT}
+            m = Middleware(m.cls, *m.args, **options)
+        stack.append(m)
+        if m.cls in CUSTOM_MIDDLEWARE and mode == "base_http":
+            stack.append(Middleware(PassThroughMiddleware))
+    return stack
+
+
+def build_app(mode: str):
+    """Отдельный собранный стек middleware поверх того же роутера"""
+    original = app.user_middleware
+    app.user_middleware = _stack(mode)
+    try:
+        return app.build_middleware_stack()
+    finally:
+        app.user_middleware = original
+
+
+async def measure(asgi_app, path: str, headers: Dict[str, str], requests: int) -> List[float]:
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        for _ in range(min(50, requests)):  # прогрев
+            await client.get(path, headers=headers)
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            if response.status_code != 200:
+                raise SystemExit(f"{path}: HTTP {response.status_code} {response.text[:200]}")
+    return timings
+
+
+async def run(requests: int, user_id: int):
+    token = create_access_token({"sub": str(user_id)})
+    targets = [
+        ("/api/health", {}),
+        ("/api/stops?per_page=20", {"Authorization": f"Bearer {token}"}),
+    ]
+    modes = ["none", "asgi", "base_http"]
+    apps = {mode: build_app(mode) for mode in modes}
+
+    for path, headers in targets:
+        print(f"{path} ({requests} запросов)")
+        medians = {}
+        for mode in modes:
+            timings = await measure(apps[mode], path, headers, requests)
+            medians[mode] = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[18]
+            overhead = medians[mode] - medians["none"]
+            print(f"  {mode:<10} median {medians[mode]:>8.1f} мкс  p95 {p95:>8.1f} мкс  "
+                  f"overhead {overhead:>+8.1f} мкс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Накладные расходы middleware")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# backend/core/cache.py
+"""
+In-process TTL-кэш для редко меняющихся справочников
+
+Хранит уже сериализованный JSON и его ETag, поэтому повторный запрос
+не обращается к БД и не пересобирает ответ, а при совпадении
+If-None-Match отдаётся 304 без тела.
+
+Кэш живёт в памяти процесса: обработчики записи вызывают invalidate()
+в своём воркере, остальные воркеры увидят изменения не позже чем через TTL.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import threading
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from core.config import settings
+from core.http_cache import etag_matches, not_modified
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class TTLCache:
+    """Потокобезопасный словарь с истечением записей и инвалидацией по префиксу"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._data: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry
+
+    def set(self, key: str, body: bytes) -> CacheEntry:
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        entry = CacheEntry(body=body, etag=etag, expires_at=time.monotonic() + self.ttl)
+        with self._lock:
+            self._data[key] = entry
+        return entry
+
+    def invalidate(self, *prefixes: str) -> None:
+        """Удаляет записи, ключ которых начинается с любого из префиксов"""
+        with self._lock:
+            for key in list(self._data):
+                if key.startswith(prefixes):
+                    del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+directory_cache = TTLCache(ttl=settings.DIRECTORY_CACHE_TTL_SECONDS)
+
+
+def cached_json_response(request: Request, key: str, loader: Callable[[], Any],
+                         cache: TTLCache = directory_cache) -> Response:
+    """
+    Ответ из кэша (или loader() при промахе) с ETag.
+    loader возвращает любые данные, пригодные для jsonable_encoder.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(jsonable_encoder(loader()), ensure_ascii=False, separators=(",", ":"))
+        entry = cache.set(key, body.encode("utf-8"))
+
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers={"ETag": entry.etag, "Cache-Control": "private, no-cache"},
+    )
@@ -0,0 +1,63 @@
+# backend/core/change_tracking.py
+"""
+Журнал изменений остановок (ТЗ 2.2.6)
+
+Изменённые поля берутся из истории атрибутов SQLAlchemy (inspect(obj).attrs),
+без снимков всех колонок до и после. Строки change_logs пишутся одним
+INSERT ... VALUES (...), (...) в транзакции вызывающего.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import insert, inspect
+from sqlalchemy.orm import Session
+
+from core.user_cache import UserSnapshot
+from models import ChangeLog
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def collect_changes(obj) -> Dict[str, Tuple[Any, Any]]:
+    """
+    {поле: (старое, новое)} для колонок, изменённых с момента загрузки объекта.
+    Вызывать до flush/commit — после них история сбрасывается.
+    """
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            changes[attr.key] = (old, new)
+    return changes
+
+
+def write_change_logs(
+    db: Session,
+    bus_stop_id: int,
+    user: UserSnapshot,
+    changes: Dict[str, Tuple[Any, Any]],
+    ip_address: Optional[str],
+) -> None:
+    """Все строки журнала изменений — одним INSERT (без ORM-объектов и flush)"""
+    if not changes:
+        return
+    db.execute(insert(ChangeLog).values([
+        {
+            "bus_stop_id": bus_stop_id,
+            "user_id": user.id,
+            "user_name": user.name,
+            "field_name": field,
+            "old_value": _as_text(old),
+            "new_value": _as_text(new),
+            "ip_address": ip_address,
+        }
+        for field, (old, new) in changes.items()
+    ]))
@@ -33,6 +33,54 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE_MB: int = 10
     ALLOWED_EXTENSIONS: List[str] = ["jpg", "jpeg", "png", "webp"]
+    # Процессов для генерации превью фото (core/images.py)
+    IMAGE_WORKERS: int = 2
+    # Возобновляемая загрузка: размер куска и срок жизни незавершённой загрузки
+    RESUMABLE_CHUNK_SIZE_KB: int = 1024
+    RESUMABLE_UPLOAD_TTL_HOURS: int = 24
+    
+    # Дашборд: интервал полного пересчёта счётчиков (секунды)
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 900
+    
+    # Аудит: буфер и пакетная запись (middleware/audit.py)
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL_MS: int = 500
+    
+    # Повторно выдавать номера удалённых остановок (BS-xxx, TP-год-xxxx)
+    ID_REUSE_GAPS: bool = False
+    
+    # TTL in-process кэша справочников (секунды)
+    DIRECTORY_CACHE_TTL_SECONDS: int = 300
+    
+    # Фоновый экспорт: потоков на процесс и срок хранения готовых файлов
+    EXPORT_WORKERS: int = 2
+    EXPORT_JOB_TTL_HOURS: int = 24
+    
+    # Секционирование audit_logs / change_logs по месяцам (core/partitions.py)
+    PARTITION_MONTHS_AHEAD: int = 3
+    # Срок хранения в месяцах (0 — бессрочно); старые секции уходят в ARCHIVE_DIR
+    AUDIT_RETENTION_MONTHS: int = 24
+    CHANGE_LOG_RETENTION_MONTHS: int = 0
+    ARCHIVE_DIR: str = "archive"
+    
+    # Хеширование паролей: схема новых хешей и стоимость bcrypt (2^N итераций).
+    # Подбор под железо: python tune_password_hash.py; старые хеши
+    # пересчитываются при следующем входе пользователя
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_TARGET_MS: int = 250
+    
+    # Проверенные access токены (core/security.py), хранятся до exp
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    
+    # Кэш текущего пользователя в get_current_user (core/user_cache.py)
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 1000
+    
+    # Пул потоков bcrypt (core/hashing.py): потоков на процесс и предел очереди
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 200
     
     # Логирование
     LOG_LEVEL: str = "INFO"
@@ -2,26 +2,37 @@
 """
 Зависимости FastAPI: аутентификация, права доступа, БД сессия
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from core.security import verify_access_token
+from core.user_cache import UserSnapshot, load_user_snapshot
 from database import get_db
-from models import User
 
 
 # Схема авторизации через Bearer Token
 security = HTTPBearer(auto_error=False)
 
 
+def _token_payload(request: Request, credentials: HTTPAuthorizationCredentials) -> dict:
+    """Payload, уже проверенный AuthMiddleware, или проверка токена здесь"""
+    payload = getattr(request.state, "jwt", None)
+    if payload is not None:
+        return payload
+    return verify_access_token(credentials.credentials)
+
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> UserSnapshot:
     """
-    Получение текущего пользователя из JWT токена
+    Получение текущего пользователя из JWT токена.
+    Возвращает снимок из кэша (core/user_cache.py), а не строку users —
+    обработчик, изменяющий самого пользователя, загружает её сам.
     """
     if not credentials:
         raise HTTPException(
@@ -30,8 +41,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    # Проверяем токен
-    payload = verify_access_token(credentials.credentials)
+    # Проверяем токен (или берём payload из AuthMiddleware)
+    payload = _token_payload(request, credentials)
     
     user_id = payload.get("sub")
     if not user_id:
@@ -40,8 +51,8 @@ async def get_current_user(
             detail="Недействительный токен"
         )
     
-    # Получаем пользователя из БД
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # Снимок пользователя из кэша (при промахе — из БД)
+    user = load_user_snapshot(db, int(user_id))
     
     if not user:
         raise HTTPException(
@@ -59,9 +70,10 @@ async def get_current_user(
 
 
 async def get_current_user_optional(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[UserSnapshot]:
     """
     Опциональное получение пользователя (для публичных эндпоинтов)
     """
@@ -69,10 +81,10 @@ async def get_current_user_optional(
         return None
     
     try:
-        payload = verify_access_token(credentials.credentials)
+        payload = _token_payload(request, credentials)
         user_id = payload.get("sub")
         if user_id:
-            return db.query(User).filter(User.id == int(user_id)).first()
+            return load_user_snapshot(db, int(user_id))
     except:
         pass
     
@@ -84,7 +96,7 @@ def require_role(*allowed_roles: str):
     Декоратор для проверки роли пользователя
     Использование: require_role("admin", "inspector")
     """
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
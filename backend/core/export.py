@@ -0,0 +1,192 @@
+# backend/core/export.py
+"""
+Потоковый экспорт остановок (GET /api/reports/export)
+
+Выбираются только колонки экспорта (без ORM-объектов), строки читаются
+серверным курсором порциями по EXPORT_BATCH_SIZE (yield_per), а тело
+ответа отдаётся кусками — память не зависит от размера парка.
+
+XLSX пишется в режиме write_only: строки сразу сериализуются в файл,
+оформление задаётся двумя именованными стилями, ширина колонок
+оценивается по первым XLSX_WIDTH_SAMPLE_ROWS строкам.
+"""
+from itertools import chain, islice
+from typing import IO, Any, Iterable, Iterator, List, Optional, Union
+import csv
+import io
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from core.stop_columns import CONDITION_LABELS, EXPORT_HEADERS, STATUS_LABELS, STOP_COLUMNS
+from models import BusStop
+
+
+# Строк на одну выборку серверного курсора
+EXPORT_BATCH_SIZE = 1000
+
+# Строк CSV на один кусок тела ответа
+CSV_CHUNK_ROWS = 500
+
+# Строк, по которым оценивается ширина колонок XLSX
+XLSX_WIDTH_SAMPLE_ROWS = 200
+XLSX_MAX_COLUMN_WIDTH = 50
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_EXPORT_COLUMNS = [getattr(BusStop, field) for _, field in STOP_COLUMNS]
+
+
+def _filtered(stmt: Select, district: Optional[str], status: Optional[str],
+              condition: Optional[str]) -> Select:
+    if district:
+        stmt = stmt.where(BusStop.district == district)
+    if status:
+        stmt = stmt.where(BusStop.status == status)
+    if condition:
+        stmt = stmt.where(BusStop.condition == condition)
+    return stmt
+
+
+def export_select(district: Optional[str] = None, status: Optional[str] = None,
+                  condition: Optional[str] = None) -> Select:
+    """SELECT колонок экспорта в порядке STOP_COLUMNS, по stop_id"""
+    return _filtered(select(*_EXPORT_COLUMNS), district, status, condition).order_by(BusStop.stop_id)
+
+
+def count_export_rows(db: Session, district: Optional[str] = None, status: Optional[str] = None,
+                      condition: Optional[str] = None) -> int:
+    """Число строк экспорта одним COUNT — для журнала аудита"""
+    return db.execute(
+        _filtered(select(func.count()).select_from(BusStop), district, status, condition)
+    ).scalar()
+
+
+def _enum_value(value: Any) -> Optional[str]:
+    return value.value if hasattr(value, "value") else value
+
+
+def format_export_row(row) -> List[Any]:
+    """Строка выборки export_select() → значения колонок EXPORT_HEADERS"""
+    status = _enum_value(row.status)
+    condition = _enum_value(row.condition)
+    seats = _enum_value(row.seats_condition)
+    roof = _enum_value(row.roof_condition)
+    return [
+        row.stop_id,
+        row.passport_number or "",
+        row.address,
+        row.landmark or "",
+        row.district,
+        row.routes or "",
+        row.latitude,
+        row.longitude,
+        STATUS_LABELS.get(status, status) if status else "",
+        CONDITION_LABELS.get(condition, condition) if condition else "",
+        "Да" if row.meets_standards else "Нет",
+        _enum_value(row.stop_type) or "",
+        row.legs_count,
+        row.year_built or "",
+        row.paint_color or "",
+        CONDITION_LABELS.get(seats, "") if seats else "",
+        _enum_value(row.roof_type) or "",
+        CONDITION_LABELS.get(roof, "") if roof else "",
+        "Да" if row.has_electricity else "Нет",
+        "Да" if row.has_bin else "Нет",
+        row.last_inspection_date.strftime("%d.%m.%Y") if row.last_inspection_date else "",
+        row.inspector_name or "",
+    ]
+
+
+def iter_export_rows(db: Session, stmt: Select) -> Iterator[List[Any]]:
+    """Отформатированные строки экспорта через серверный курсор (yield_per)"""
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        for row in result:
+            yield format_export_row(row)
+    finally:
+        result.close()
+
+
+def iter_csv(rows: Iterable[List[Any]]) -> Iterator[str]:
+    """CSV с заголовком, кусками по CSV_CHUNK_ROWS строк"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _xlsx_styles():
+    """Именованные стили заголовка и ячейки (общие для всех ячеек книги)"""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header = NamedStyle(
+        name="export_header",
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid"),
+        alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        border=border,
+    )
+    cell = NamedStyle(name="export_cell", alignment=Alignment(vertical="center"), border=border)
+    return header, cell
+
+
+def _column_widths(sample: List[List[Any]]) -> List[float]:
+    widths = [len(header) for header in EXPORT_HEADERS]
+    for row in sample:
+        for i, value in enumerate(row):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)))
+    return [min(width + 2, XLSX_MAX_COLUMN_WIDTH) for width in widths]
+
+
+def write_xlsx(rows: Iterable[List[Any]], target: Union[str, IO[bytes]]) -> int:
+    """
+    Запись строк экспорта в XLSX (путь или бинарный файл).
+    Требует openpyxl. Возвращает число строк данных.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    header_style, cell_style = _xlsx_styles()
+    wb.add_named_style(header_style)
+    wb.add_named_style(cell_style)
+
+    ws = wb.create_sheet("Остановки")
+    ws.freeze_panes = "A2"
+
+    # В write_only ширины задаются до первой строки
+    rows = iter(rows)
+    sample = list(islice(rows, XLSX_WIDTH_SAMPLE_ROWS))
+    for i, width in enumerate(_column_widths(sample), 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    def styled(values, style):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            cells.append(cell)
+        return cells
+
+    ws.append(styled(EXPORT_HEADERS, header_style.name))
+    written = 0
+    for row in chain(sample, rows):
+        ws.append(styled(row, cell_style.name))
+        written += 1
+
+    wb.save(target)
+    return written
@@ -0,0 +1,270 @@
+# backend/core/export_jobs.py
+"""
+Фоновые задачи экспорта (POST /api/reports/export/jobs)
+
+Задача хранится в export_jobs, поэтому статус виден из любого воркера
+gunicorn. Сам экспорт выполняется в пуле потоков процесса, принявшего
+задачу (EXPORT_WORKERS), вне event loop и вне таймаута запроса.
+Готовый файл пишется в exports/ и скачивается через статику /exports;
+имя файла содержит id задачи (uuid4), который знает только автор.
+
+Повторная задача того же автора с теми же форматом и фильтрами при
+неизменных данных (cache_key учитывает автора и версию данных bus_stops)
+получает уже готовую или выполняющуюся задачу вместо нового экспорта.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.export import (
+    EXPORT_BATCH_SIZE, count_export_rows, export_select, iter_csv, iter_export_rows, write_xlsx,
+)
+from core.user_cache import UserSnapshot
+from database import SessionLocal
+from models import BusStop, ExportJob
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "exports"
+
+# Задача в статусе running, не обновлявшая прогресс дольше этого с момента
+# запуска или последней порции строк, и pending-задача, созданная раньше
+# этого, считаются потерянными (очередь пула пропала при перезапуске
+# воркера) и не переиспользуются
+STALE_JOB_SECONDS = 300
+
+ORPHANED_JOB_ERROR = "Задача прервана перезапуском сервера, запустите экспорт заново"
+
+_executor = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export")
+
+# Поставленные в пул этого процесса и ещё не запущенные задачи
+_queued: Set[str] = set()
+_queued_lock = threading.Lock()
+
+
+def data_version(db: Session) -> str:
+    """Версия данных bus_stops: число строк и последнее изменение"""
+    count, last_update = db.execute(
+        select(func.count(BusStop.id), func.max(BusStop.updated_at))
+    ).one()
+    return f"{count}:{last_update.isoformat() if last_update else ''}"
+
+
+def make_cache_key(user_id: int, fmt: str, filters: dict, version: str) -> str:
+    """Ключ включает автора: задачу опрашивает и скачивает только он (или админ)"""
+    raw = json.dumps({"u": user_id, "f": fmt, "q": filters, "v": version}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def job_file_path(job: ExportJob) -> Optional[str]:
+    return os.path.join(EXPORT_DIR, job.file_name) if job.file_name else None
+
+
+def job_to_dict(job: ExportJob, cached: bool = False) -> dict:
+    progress = None
+    if job.status == "done":
+        progress = 1.0
+    elif job.total_rows:
+        progress = round(min(job.processed_rows / job.total_rows, 1.0), 4)
+    return {
+        "id": job.id,
+        "format": job.format,
+        "filters": job.filters or {},
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows,
+        "progress": progress,
+        "download_url": f"/exports/{job.file_name}" if job.status == "done" else None,
+        "error": job.error,
+        "cached": cached,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _find_reusable(db: Session, cache_key: str) -> Optional[ExportJob]:
+    """Готовая задача с живым файлом, ожидающая или выполняющаяся (не потерянная)"""
+    stale_before = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    candidates = (
+        db.query(ExportJob)
+        .filter(ExportJob.cache_key == cache_key, ExportJob.status != "failed")
+        .order_by(ExportJob.created_at.desc())
+        .all()
+    )
+    for job in candidates:
+        if job.status == "done" and os.path.exists(job_file_path(job)):
+            return job
+        if job.status == "pending" and job.created_at and job.created_at >= stale_before:
+            return job
+        if job.status == "running":
+            last_progress = max(filter(None, (job.started_at, job.updated_at)), default=None)
+            if last_progress and last_progress >= stale_before:
+                return job
+    return None
+
+
+def purge_expired_jobs(db: Session) -> int:
+    """Удаляет задачи и файлы старше EXPORT_JOB_TTL_HOURS"""
+    cutoff = datetime.now() - timedelta(hours=settings.EXPORT_JOB_TTL_HOURS)
+    expired = db.query(ExportJob).filter(ExportJob.created_at < cutoff).all()
+    for job in expired:
+        path = job_file_path(job)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"⚠️ Cannot remove export file {path}: {e}")
+        db.delete(job)
+    if expired:
+        db.commit()
+    return len(expired)
+
+
+def submit_export_job(db: Session, user: UserSnapshot, fmt: str, filters: dict) -> Tuple[ExportJob, bool]:
+    """
+    Создаёт задачу (или находит готовую с тем же cache_key).
+    Возвращает (задача, взята_ли_из_кэша).
+    """
+    purge_expired_jobs(db)
+
+    cache_key = make_cache_key(user.id, fmt, filters, data_version(db))
+    existing = _find_reusable(db, cache_key)
+    if existing is not None:
+        return existing, True
+
+    job = ExportJob(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        format=fmt,
+        filters=filters,
+        cache_key=cache_key,
+        status="pending",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    with _queued_lock:
+        _queued.add(job.id)
+    _executor.submit(run_export_job, job.id)
+    return job, False
+
+
+def _update_job(job_id: str, **values: Any) -> None:
+    """Обновление статуса в отдельной короткой транзакции"""
+    with SessionLocal() as db:
+        db.query(ExportJob).filter(ExportJob.id == job_id).update(
+            {**values, "updated_at": func.now()}, synchronize_session=False
+        )
+        db.commit()
+
+
+def _with_progress(job_id: str, rows: Iterable[List[Any]]) -> Iterator[List[Any]]:
+    processed = 0
+    for row in rows:
+        yield row
+        processed += 1
+        if processed % EXPORT_BATCH_SIZE == 0:
+            _update_job(job_id, processed_rows=processed)
+    _update_job(job_id, processed_rows=processed)
+
+
+def run_export_job(job_id: str) -> None:
+    """
+    Выполнение задачи в потоке пула. Строки читаются серверным курсором
+    в своей сессии; прогресс пишется отдельными транзакциями, чтобы не
+    закрыть курсор коммитом. Файл появляется в exports/ только целиком.
+    """
+    with _queued_lock:
+        _queued.discard(job_id)
+    db = SessionLocal()
+    tmp_path = None
+    try:
+        # Задачу, уже помеченную потерянной (fail_orphaned_jobs), не запускаем
+        claimed = db.query(ExportJob).filter(
+            ExportJob.id == job_id, ExportJob.status == "pending"
+        ).update({"status": "running", "started_at": func.now(), "updated_at": func.now()},
+                 synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return
+        job = db.get(ExportJob, job_id)
+        filters = job.filters or {}
+        file_name = f"bus_stops_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job_id}.{job.format}"
+        final_path = os.path.join(EXPORT_DIR, file_name)
+        tmp_path = final_path + ".part"
+
+        _update_job(job_id, total_rows=count_export_rows(db, **filters))
+
+        rows = _with_progress(job_id, iter_export_rows(db, export_select(**filters)))
+        if job.format == "csv":
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                for chunk in iter_csv(rows):
+                    f.write(chunk)
+        else:
+            write_xlsx(rows, tmp_path)
+
+        os.replace(tmp_path, final_path)
+        tmp_path = None
+        _update_job(job_id, status="done", file_name=file_name, finished_at=func.now())
+        logger.info(f"✅ Export job {job_id} done: {file_name}")
+    except Exception as e:
+        logger.error(f"❌ Export job {job_id} failed: {e}")
+        _update_job(job_id, status="failed", error=str(e)[:1000], finished_at=func.now())
+    finally:
+        db.close()
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _fail_pending(db: Session, *conditions) -> int:
+    failed = db.query(ExportJob).filter(ExportJob.status == "pending", *conditions).update(
+        {"status": "failed", "error": ORPHANED_JOB_ERROR,
+         "finished_at": func.now(), "updated_at": func.now()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return failed
+
+
+def fail_orphaned_jobs() -> int:
+    """
+    При старте: pending-задачи старше STALE_JOB_SECONDS остались от
+    упавшего или перезапущенного воркера — их очередь пропала вместе с ним
+    """
+    stale_before = datetime.now() - timedelta(seconds=STALE_JOB_SECONDS)
+    with SessionLocal() as db:
+        failed = _fail_pending(db, ExportJob.created_at < stale_before)
+    if failed:
+        logger.warning(f"⚠️ Export jobs orphaned by a restart marked failed: {failed}")
+    return failed
+
+
+def shutdown_export_workers() -> None:
+    """
+    Остановка пула при завершении приложения: незапущенные задачи
+    отменяются и помечаются failed, чтобы клиент не ждал их вечно
+    """
+    _executor.shutdown(wait=False, cancel_futures=True)
+    with _queued_lock:
+        job_ids = list(_queued)
+        _queued.clear()
+    if not job_ids:
+        return
+    try:
+        with SessionLocal() as db:
+            failed = _fail_pending(db, ExportJob.id.in_(job_ids))
+        logger.info(f"✅ Unstarted export jobs marked failed: {failed}")
+    except Exception as e:
+        logger.error(f"❌ Cannot mark unstarted export jobs failed: {e}")
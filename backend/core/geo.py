@@ -0,0 +1,50 @@
+# backend/core/geo.py
+"""
+Геометрия для карты: тайлы XYZ (Web Mercator) и сетка кластеризации
+"""
+from typing import NamedTuple
+import math
+
+
+# До этого зума (включительно) карта получает кластеры, а не отдельные точки
+CLUSTER_MAX_ZOOM = 13
+
+# Размер сетки кластеризации на один тайл/viewport (GRID x GRID ячеек)
+CLUSTER_GRID = 8
+
+# Если в viewport больше точек — отдаём кластеры даже на крупном зуме
+MAX_POINTS_PER_VIEWPORT = 5000
+
+
+class BBox(NamedTuple):
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+
+    @property
+    def is_valid(self) -> bool:
+        return (
+            -90 <= self.min_lat < self.max_lat <= 90
+            and -180 <= self.min_lon < self.max_lon <= 180
+        )
+
+
+def tile_to_bbox(z: int, x: int, y: int) -> BBox:
+    """Границы тайла z/x/y в градусах (схема XYZ, как у Leaflet/OSM)"""
+    n = 2 ** z
+
+    def lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return BBox(
+        min_lat=lat(y + 1),
+        min_lon=x / n * 360.0 - 180.0,
+        max_lat=lat(y),
+        max_lon=(x + 1) / n * 360.0 - 180.0,
+    )
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    n = 2 ** z
+    return 0 <= z <= 22 and 0 <= x < n and 0 <= y < n
@@ -0,0 +1,115 @@
+# backend/core/hashing.py
+"""
+Хеширование и проверка паролей вне event loop
+
+bcrypt занимает ~250 мс CPU на операцию; вызванный прямо в async-обработчике,
+он останавливает все запросы воркера (вход 100 инспекторов в начале смены).
+Операции выполняются в отдельном пуле потоков PASSWORD_HASH_WORKERS
+(bcrypt отпускает GIL). Очередь ограничена PASSWORD_HASH_MAX_QUEUE:
+при переполнении запрос получает 503, а не ждёт минуты.
+Глубина очереди и время ожидания — в password_hasher.metrics() (/api/health).
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
+import asyncio
+import threading
+import time
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+from core.security import get_password_hash, verify_and_update_password, verify_password
+
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """Ограниченный пул потоков для bcrypt с метриками очереди"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Метрики
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.last_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.last_duration_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    def _run(self, fn: Callable[..., T], submitted: float, *args) -> T:
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.last_wait_ms = round((started - submitted) * 1000, 1)
+            self.max_wait_ms = max(self.max_wait_ms, self.last_wait_ms)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.last_duration_ms = round((time.monotonic() - started) * 1000, 1)
+
+    def _submit(self, fn: Callable[..., T], *args) -> Future:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервер перегружен, повторите вход через несколько секунд",
+                )
+            self.queued += 1
+        return self._get_executor().submit(self._run, fn, time.monotonic(), *args)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(verify_password, plain_password, hashed_password))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Проверка с пересчётом устаревшего хеша (см. verify_and_update_password)"""
+        return await asyncio.wrap_future(
+            self._submit(verify_and_update_password, plain_password, hashed_password)
+        )
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Синхронное параллельное хеширование (стартовые данные, скрипты)"""
+        futures = [self._submit(get_password_hash, password) for password in passwords]
+        return [future.result() for future in futures]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "last_wait_ms": self.last_wait_ms,
+                "max_wait_ms": self.max_wait_ms,
+                "last_duration_ms": self.last_duration_ms,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
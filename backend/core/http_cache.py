@@ -0,0 +1,31 @@
+# backend/core/http_cache.py
+"""
+HTTP-кэширование: ETag и условные запросы (If-None-Match → 304)
+"""
+from typing import Any, Optional
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Слабый ETag из произвольных частей версии данных (max(updated_at), count, ...)"""
+    raw = "|".join(str(p) for p in parts)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверка заголовка If-None-Match (поддерживается список и '*')"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {c.strip() for c in header.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str, cache_control: Optional[str] = "private, no-cache") -> Response:
+    """Пустой ответ 304 с тем же ETag"""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return Response(status_code=304, headers=headers)
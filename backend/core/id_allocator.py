@@ -0,0 +1,164 @@
+# backend/core/id_allocator.py
+"""
+Выдача номеров остановок (BS-001) и паспортов (TP-2024-0001)
+
+Последний выданный номер серии хранится в id_counters и увеличивается
+одним UPDATE ... RETURNING. Строка счётчика блокируется до коммита,
+поэтому параллельные создания не получат одинаковый номер.
+Диапазон номеров для массового создания резервируется тем же запросом.
+
+Счётчик серии создаётся при первом обращении: начальное значение —
+максимальный существующий номер в bus_stops.
+"""
+from datetime import datetime
+from typing import Callable, List, Optional
+import re
+
+from sqlalchemy import Integer, cast, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import BusStop, IdCounter, IdFreeSlot
+
+
+STOP_SERIES = "stop"
+
+_STOP_RE = re.compile(r"^BS-(\d+)$")
+_PASSPORT_RE = re.compile(r"^TP-(\d{4})-(\d+)$")
+
+
+def format_stop_id(num: int) -> str:
+    return f"BS-{str(num).zfill(3)}"
+
+
+def format_passport_number(year: int, num: int) -> str:
+    return f"TP-{year}-{str(num).zfill(4)}"
+
+
+def _passport_series(year: int) -> str:
+    return f"passport:{year}"
+
+
+def _max_stop_number(db: Session) -> int:
+    return db.query(
+        func.coalesce(func.max(cast(func.substring(BusStop.stop_id, r"^BS-(\d+)$"), Integer)), 0)
+    ).scalar()
+
+
+def _max_passport_number(db: Session, year: int) -> int:
+    return db.query(
+        func.coalesce(func.max(cast(
+            func.substring(BusStop.passport_number, rf"^TP-{year}-(\d+)$"), Integer
+        )), 0)
+    ).scalar()
+
+
+def _bump(db: Session, series: str, count: int) -> Optional[int]:
+    return db.execute(
+        update(IdCounter)
+        .where(IdCounter.name == series)
+        .values(value=IdCounter.value + count)
+        .returning(IdCounter.value)
+    ).scalar()
+
+
+def _allocate(db: Session, series: str, count: int, seed: Callable[[], int]) -> int:
+    """Резервирует count номеров серии, возвращает последний из них"""
+    last = _bump(db, series, count)
+    if last is None:
+        db.execute(
+            pg_insert(IdCounter)
+            .values(name=series, value=seed())
+            .on_conflict_do_nothing(index_elements=[IdCounter.name])
+        )
+        last = _bump(db, series, count)
+    return last
+
+
+def _pop_free_slot(db: Session, series: str) -> Optional[int]:
+    """Наименьший освободившийся номер серии (SKIP LOCKED — без ожидания соседей)"""
+    slot = (
+        db.query(IdFreeSlot)
+        .filter(IdFreeSlot.name == series)
+        .order_by(IdFreeSlot.value.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if slot is None:
+        return None
+    value = slot.value
+    db.delete(slot)
+    return value
+
+
+def _next(db: Session, series: str, seed: Callable[[], int]) -> int:
+    if settings.ID_REUSE_GAPS:
+        free = _pop_free_slot(db, series)
+        if free is not None:
+            return free
+    return _allocate(db, series, 1, seed)
+
+
+# ============== PUBLIC API ==============
+
+
+def next_stop_id(db: Session) -> str:
+    return format_stop_id(_next(db, STOP_SERIES, lambda: _max_stop_number(db)))
+
+
+def next_passport_number(db: Session, year: Optional[int] = None) -> str:
+    year = year or datetime.now().year
+    num = _next(db, _passport_series(year), lambda: _max_passport_number(db, year))
+    return format_passport_number(year, num)
+
+
+def reserve_stop_ids(db: Session, count: int) -> List[str]:
+    """Диапазон из count номеров остановок за один запрос (без повторной выдачи)"""
+    if count <= 0:
+        return []
+    last = _allocate(db, STOP_SERIES, count, lambda: _max_stop_number(db))
+    return [format_stop_id(n) for n in range(last - count + 1, last + 1)]
+
+
+def reserve_passport_numbers(db: Session, count: int, year: Optional[int] = None) -> List[str]:
+    """Диапазон из count номеров паспортов за один запрос"""
+    if count <= 0:
+        return []
+    year = year or datetime.now().year
+    last = _allocate(db, _passport_series(year), count, lambda: _max_passport_number(db, year))
+    return [format_passport_number(year, n) for n in range(last - count + 1, last + 1)]
+
+
+def release_ids(db: Session, stop_id: Optional[str], passport_number: Optional[str]) -> None:
+    """Возврат номеров удалённой остановки в free-list (только при ID_REUSE_GAPS)"""
+    if not settings.ID_REUSE_GAPS:
+        return
+
+    slots = []
+    match = _STOP_RE.match(stop_id or "")
+    if match:
+        slots.append({"name": STOP_SERIES, "value": int(match.group(1))})
+    match = _PASSPORT_RE.match(passport_number or "")
+    if match:
+        slots.append({"name": _passport_series(int(match.group(1))), "value": int(match.group(2))})
+
+    if slots:
+        db.execute(pg_insert(IdFreeSlot).values(slots).on_conflict_do_nothing())
+
+
+def sync_id_counters(db: Session) -> None:
+    """
+    Подтягивает существующие счётчики до максимального номера в bus_stops
+    (на случай вставок в обход API — seed.py, ручной SQL). Вызывается при старте.
+    """
+    for counter in db.query(IdCounter).with_for_update().all():
+        if counter.name == STOP_SERIES:
+            current_max = _max_stop_number(db)
+        elif counter.name.startswith("passport:"):
+            current_max = _max_passport_number(db, int(counter.name.split(":", 1)[1]))
+        else:
+            continue
+        if current_max > counter.value:
+            counter.value = current_max
+    db.commit()
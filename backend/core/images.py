@@ -0,0 +1,119 @@
+# backend/core/images.py
+"""
+Производные изображения фотографий остановок
+
+Для каждого оригинала создаются превью (thumb) и средний размер (medium)
+в JPEG и WebP рядом с файлом: <имя>_thumb.jpg, <имя>_thumb.webp, ...
+Ориентация берётся из EXIF (снимки с телефона), метаданные не копируются.
+
+Декодирование и ресайз — CPU-bound, поэтому выполняются в пуле процессов
+(IMAGE_WORKERS): при загрузке фото и лениво при первом запросе варианта,
+если его ещё нет (фото, загруженные до появления вариантов).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import asyncio
+import os
+
+from PIL import Image, ImageOps
+
+from core.config import settings
+
+
+# Максимальная сторона для размеров
+VARIANT_SIZES = {"thumb": 320, "medium": 1280}
+
+# Вариант → (размер, расширение)
+PHOTO_VARIANTS = {
+    "thumb": ("thumb", "jpg"),
+    "thumb_webp": ("thumb", "webp"),
+    "medium": ("medium", "jpg"),
+    "medium_webp": ("medium", "webp"),
+}
+
+VARIANT_MEDIA_TYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+
+_SAVE_OPTIONS = {
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def variant_path(file_path: str, variant: str) -> str:
+    size, ext = PHOTO_VARIANTS[variant]
+    stem, _ = os.path.splitext(file_path)
+    return f"{stem}_{size}.{ext}"
+
+
+def variant_media_type(variant: str) -> str:
+    return VARIANT_MEDIA_TYPES[PHOTO_VARIANTS[variant][1]]
+
+
+def generate_variants(file_path: str) -> List[str]:
+    """
+    Создаёт недостающие варианты оригинала, возвращает их пути.
+    Синхронная — выполняется в процессе пула. Каждый файл пишется
+    во временный и переименовывается, поэтому параллельная генерация
+    одного фото не отдаёт клиенту недописанный файл.
+    """
+    missing = [v for v in PHOTO_VARIANTS if not os.path.exists(variant_path(file_path, v))]
+    if not missing:
+        return []
+
+    with Image.open(file_path) as original:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        original.draft("RGB", (VARIANT_SIZES["medium"], VARIANT_SIZES["medium"]))
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        resized = {}
+        created = []
+        for variant in missing:
+            size, ext = PHOTO_VARIANTS[variant]
+            if size not in resized:
+                copy = image.copy()
+                copy.thumbnail((VARIANT_SIZES[size], VARIANT_SIZES[size]), Image.LANCZOS, reducing_gap=3.0)
+                resized[size] = copy
+
+            path = variant_path(file_path, variant)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            resized[size].save(tmp_path, **_SAVE_OPTIONS[ext])
+            os.replace(tmp_path, path)
+            created.append(path)
+
+    return created
+
+
+def remove_variants(file_path: str) -> None:
+    for variant in PHOTO_VARIANTS:
+        path = variant_path(file_path, variant)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+async def ensure_variants(file_path: str) -> List[str]:
+    """Генерация недостающих вариантов в пуле процессов (не блокирует event loop)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), generate_variants, file_path)
+
+
+def shutdown_image_workers() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
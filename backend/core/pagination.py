@@ -0,0 +1,139 @@
+# backend/core/pagination.py
+"""
+Пагинация: keyset-курсоры и оценка количества строк
+
+Курсор — непрозрачная base64-строка с последним значением колонки сортировки
+и id записи. Следующая страница продолжается с этой точки через
+сравнение кортежей (col, id), поэтому глубина страницы не влияет на скорость.
+"""
+from datetime import datetime
+from typing import Any, Optional, Tuple
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Query, Session
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: int) -> str:
+    """Упаковка позиции (значение сортировки + id) в непрозрачную строку"""
+    payload = {"s": sort_by, "o": sort_order, "v": _encode_value(value), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, int]:
+    """
+    Распаковка курсора. Курсор действителен только для той же сортировки,
+    с которой он был выдан.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, row_id = _decode_value(payload["v"]), int(payload["id"])
+        cursor_sort, cursor_order = payload["s"], payload["o"]
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+
+    if cursor_sort != sort_by or cursor_order != sort_order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курсор выдан для другой сортировки"
+        )
+
+    return value, row_id
+
+
+def apply_keyset(query: Query, sort_column, id_column, sort_order: str,
+                 after: Optional[Tuple[Any, int]] = None) -> Query:
+    """
+    Сортировка по (sort_column, id) и продолжение после позиции курсора.
+    id добавляется как tie-breaker, чтобы порядок был строгим.
+    """
+    if after is not None:
+        value, row_id = after
+        key = tuple_(sort_column, id_column)
+        if sort_order == "desc":
+            query = query.filter(key < tuple_(value, row_id))
+        else:
+            query = query.filter(key > tuple_(value, row_id))
+
+    if sort_order == "desc":
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column.asc(), id_column.asc())
+
+
+def estimate_table_rows(db: Session, table_name: str) -> Optional[int]:
+    """
+    Оценка числа строк из статистики планировщика (pg_class.reltuples).
+    Для секционированной таблицы (audit_logs, change_logs) — сумма по секциям:
+    у родителя своей статистики нет.
+    Возвращает None, если статистика ещё не собрана (ANALYZE не выполнялся).
+    """
+    try:
+        estimate = db.execute(
+            text(
+                "SELECT CASE WHEN p.relkind = 'p' THEN ("
+                "  SELECT sum(c.reltuples)::bigint FROM pg_inherits i"
+                "  JOIN pg_class c ON c.oid = i.inhrelid"
+                "  WHERE i.inhparent = p.oid AND c.reltuples >= 0"
+                ") ELSE p.reltuples::bigint END "
+                "FROM pg_class p WHERE p.oid = to_regclass(:t)"
+            ),
+            {"t": table_name},
+        ).scalar()
+    except Exception:
+        return None
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def capped_count(query: Query, cap: int) -> Tuple[int, bool]:
+    """
+    Подсчёт не более cap строк.
+    Возвращает (количество, точное_ли_значение).
+    """
+    subq = query.order_by(None).limit(cap + 1).subquery()
+    count = query.session.query(func.count()).select_from(subq).scalar() or 0
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+def count_rows(query: Query, mode: str, table_name: str, filtered: bool,
+               cap: int = 10000) -> Tuple[Optional[int], bool]:
+    """
+    Количество строк для ответа со списком.
+
+    :param mode: exact — точный COUNT(*), estimated — оценка, none — не считать
+    :param filtered: есть ли в запросе фильтры (тогда reltuples неприменим)
+    :return: (количество или None, точное_ли_значение)
+    """
+    if mode == "none":
+        return None, False
+    if mode == "estimated":
+        if not filtered:
+            estimate = estimate_table_rows(query.session, table_name)
+            if estimate is not None:
+                return estimate, False
+        return capped_count(query, cap)
+    return query.order_by(None).count(), True
@@ -0,0 +1,278 @@
+# backend/core/partitions.py
+"""
+Помесячное секционирование audit_logs и change_logs (PARTITION BY RANGE)
+
+Секция месяца называется <таблица>_yYYYYmMM и покрывает
+[1-е число месяца, 1-е число следующего). Секция <таблица>_default
+принимает строки вне созданных диапазонов, чтобы вставка не падала.
+
+- ensure_partitions()   — создаёт секции текущего и PARTITION_MONTHS_AHEAD
+                          следующих месяцев (при старте приложения и из
+                          manage_partitions.py);
+- migrate_to_partitioned() — однократный перевод существующей обычной
+                          таблицы в секционированную с переносом строк;
+- archive_expired()     — секции старше срока хранения отсоединяются,
+                          выгружаются в ARCHIVE_DIR/<секция>.csv.gz и удаляются.
+"""
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import gzip
+import logging
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from core.config import settings
+from models import AuditLog, ChangeLog
+
+
+logger = logging.getLogger(__name__)
+
+# Таблица → (модель, колонка ключа секционирования)
+PARTITIONED_TABLES = {
+    "audit_logs": (AuditLog, "timestamp"),
+    "change_logs": (ChangeLog, "changed_at"),
+}
+
+_PARTITION_RE = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def _retention_months(table: str) -> int:
+    """Срок хранения в месяцах (0 — хранить бессрочно)"""
+    if table == "audit_logs":
+        return settings.AUDIT_RETENTION_MONTHS
+    return settings.CHANGE_LOG_RETENTION_MONTHS
+
+
+def add_months(day: date, months: int) -> date:
+    """1-е число месяца, отстоящего от day на months"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": table},
+    ).first() is not None
+
+
+def list_partitions(conn: Connection, table: str) -> List[Tuple[str, date]]:
+    """Помесячные секции таблицы: [(имя, первый день месяца)] по возрастанию"""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ),
+        {"t": table},
+    ).scalars()
+
+    result = []
+    for name in rows:
+        match = _PARTITION_RE.search(name)
+        if match:
+            result.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(result, key=lambda item: item[1])
+
+
+def _move_default_rows(conn: Connection, table: str, month: date) -> int:
+    """
+    Строки месяца, уже попавшие в секцию default, убираются из неё во
+    временную таблицу (иначе CREATE ... PARTITION OF падает). Вернуть их
+    после создания секции — _restore_default_rows в той же транзакции.
+    """
+    default = f"{table}_default"
+    if conn.execute(text("SELECT to_regclass(:t)"), {"t": default}).scalar() is None:
+        return 0
+
+    column = PARTITIONED_TABLES[table][1]
+    conn.execute(text(f'CREATE TEMP TABLE "_moved_{table}" (LIKE "{table}") ON COMMIT DROP'))
+    return conn.execute(text(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE "{column}" >= :start AND "{column}" < :end '
+        f'RETURNING *) INSERT INTO "_moved_{table}" SELECT * FROM moved'
+    ), {"start": month, "end": add_months(month, 1)}).rowcount
+
+
+def _restore_default_rows(conn: Connection, table: str) -> None:
+    conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "_moved_{table}"'))
+
+
+def _create_month(conn: Connection, table: str, month: date) -> None:
+    moved = _move_default_rows(conn, table, month)
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" '
+        f'PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    if moved:
+        _restore_default_rows(conn, table)
+        logger.info(f"✅ Moved {moved} rows from {table}_default to {partition_name(table, month)}")
+
+
+def _create_default(conn: Connection, table: str) -> None:
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+
+def ensure_partitions(engine: Engine, months_ahead: Optional[int] = None) -> Dict[str, int]:
+    """
+    Секции текущего и следующих months_ahead месяцев для всех секционированных таблиц.
+    Несекционированные таблицы (старые установки) пропускаются с предупреждением.
+    Каждая секция создаётся в своей транзакции: ошибка одной (блокировка,
+    конфликт с default) пропускает её с предупреждением, остальные создаются.
+    Возвращает {таблица: число созданных секций}.
+    """
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = date.today().replace(day=1)
+    created = {}
+
+    for table in PARTITIONED_TABLES:
+        with engine.begin() as conn:
+            if not is_partitioned(conn, table):
+                logger.warning(
+                    f"⚠️ {table} is not partitioned, run: python manage_partitions.py migrate"
+                )
+                continue
+            existing = {month for _, month in list_partitions(conn, table)}
+            _create_default(conn, table)
+
+        created[table] = 0
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            try:
+                with engine.begin() as conn:
+                    _create_month(conn, table, month)
+                created[table] += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Partition {partition_name(table, month)} skipped: {e}")
+    return created
+
+
+def migrate_to_partitioned(engine: Engine, table: str) -> int:
+    """
+    Однократный перевод обычной таблицы в секционированную.
+    Выполняется в одной транзакции под ACCESS EXCLUSIVE: старая таблица
+    переименовывается, создаётся секционированная по модели, строки
+    переносятся в помесячные секции, счётчик id продолжается с максимума.
+    Возвращает число перенесённых строк.
+    """
+    model, column = PARTITIONED_TABLES[table]
+    legacy = f"{table}_legacy"
+
+    with engine.begin() as conn:
+        if is_partitioned(conn, table):
+            return 0
+
+        conn.execute(text(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE'))
+        conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+        # Имена индексов глобальны в схеме — освобождаем их для новой таблицы
+        for index_name in conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": legacy}
+        ).scalars().all():
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:55]}_legacy"'))
+
+        model.__table__.create(bind=conn)
+
+        first, last = conn.execute(
+            text(f'SELECT min("{column}"), max("{column}") FROM "{legacy}"')
+        ).one()
+        current = date.today().replace(day=1)
+        month = (first.date().replace(day=1) if first else current)
+        end = add_months(max(last.date().replace(day=1) if last else current, current),
+                         settings.PARTITION_MONTHS_AHEAD)
+        while month <= end:
+            _create_month(conn, table, month)
+            month = add_months(month, 1)
+        _create_default(conn, table)
+
+        columns = [c.name for c in model.__table__.columns]
+        select_list = ", ".join(
+            f'coalesce("{name}", now())' if name == column else f'"{name}"' for name in columns
+        )
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        moved = conn.execute(text(
+            f'INSERT INTO "{table}" ({column_list}) SELECT {select_list} FROM "{legacy}"'
+        )).rowcount
+
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f'(SELECT coalesce(max(id), 0) + 1 FROM "{table}"), false)'
+        ))
+        conn.execute(text(f'DROP TABLE "{legacy}"'))
+
+    logger.info(f"✅ {table}: migrated {moved} rows to monthly partitions")
+    return moved
+
+
+def _export_partition(conn: Connection, partition: str, path: str) -> None:
+    """COPY секции в gzip-CSV с заголовком (через курсор psycopg2)"""
+    cursor = conn.connection.cursor()
+    try:
+        with gzip.open(path, "wb") as out:
+            cursor.copy_expert(f'COPY "{partition}" TO STDOUT WITH (FORMAT csv, HEADER)', out)
+    finally:
+        cursor.close()
+
+
+def archive_expired(engine: Engine, dry_run: bool = False) -> List[str]:
+    """
+    Секции, целиком вышедшие за срок хранения, отсоединяются от таблицы,
+    выгружаются в ARCHIVE_DIR/<секция>.csv.gz и удаляются.
+    Каждая секция обрабатывается в своей транзакции: файл пишется до DROP,
+    поэтому при ошибке выгрузки данные остаются в БД.
+    Возвращает имена обработанных (при dry_run — подлежащих архивации) секций.
+    """
+    os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+    current = date.today().replace(day=1)
+    archived = []
+
+    for table in PARTITIONED_TABLES:
+        months = _retention_months(table)
+        if months <= 0:
+            continue
+        cutoff = add_months(current, -months)
+
+        with engine.connect() as conn:
+            if not is_partitioned(conn, table):
+                continue
+            expired = [name for name, month in list_partitions(conn, table) if month < cutoff]
+
+        for name in expired:
+            if dry_run:
+                archived.append(name)
+                continue
+            path = os.path.join(settings.ARCHIVE_DIR, f"{name}.csv.gz")
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                _export_partition(conn, name, path)
+                conn.execute(text(f'DROP TABLE "{name}"'))
+            archived.append(name)
+            logger.info(f"📦 {name} archived to {path}")
+
+    return archived
+
+
+def partition_report(engine: Engine) -> Dict[str, List[Tuple[str, int]]]:
+    """Секции и оценка числа строк (pg_class.reltuples) — для manage_partitions.py status"""
+    report = {}
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                report[table] = []
+                continue
+            report[table] = [
+                (name, int(conn.execute(
+                    text("SELECT greatest(reltuples, 0) FROM pg_class WHERE oid = to_regclass(:p)"),
+                    {"p": name},
+                ).scalar() or 0))
+                for name, _ in list_partitions(conn, table)
+            ]
+    return report
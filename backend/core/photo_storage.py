@@ -0,0 +1,104 @@
+# backend/core/photo_storage.py
+"""
+Контентно-адресуемое хранилище фотографий
+
+Файл хранится один раз по SHA-256 содержимого:
+uploads/blobs/ab/cd/<sha256>.<ext>. Строки photos ссылаются на photo_blobs,
+у блоба — счётчик ссылок. Повторная загрузка того же снимка (на другую
+остановку или после обрыва) не занимает места на диске; файл и его
+варианты (core/images.py) удаляются вместе с последней ссылкой.
+
+Счётчик меняется через UPSERT / UPDATE ... RETURNING, а файл переносится
+или удаляется до коммита, пока строка блоба заблокирована, — поэтому
+параллельные загрузка и удаление одного снимка не теряют файл.
+
+Фото, загруженные до хранилища (blob_sha256 IS NULL), удаляются по file_path.
+"""
+from typing import Optional
+import os
+import uuid
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.images import remove_variants
+from models import Photo, PhotoBlob
+
+
+BLOB_DIR = os.path.join(settings.UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(settings.UPLOAD_DIR, "tmp")
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], f"{sha256}.{ext}")
+
+
+def new_temp_path() -> str:
+    """Путь для записи загрузки до того, как известен её хэш"""
+    os.makedirs(TMP_DIR, exist_ok=True)
+    return os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    remove_variants(path)
+
+
+def acquire_blob(db: Session, sha256: str, tmp_path: str, ext: str,
+                 file_size: int, mime_type: Optional[str]) -> str:
+    """
+    +1 ссылка на блоб (новый блоб создаётся) и перенос временного файла
+    на место блоба. Возвращает file_path блоба. Коммит — за вызывающим.
+    """
+    file_path = db.execute(
+        pg_insert(PhotoBlob)
+        .values(sha256=sha256, file_path=blob_path(sha256, ext), file_size=file_size,
+                mime_type=mime_type, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[PhotoBlob.sha256],
+            set_={"ref_count": PhotoBlob.ref_count + 1},
+        )
+        .returning(PhotoBlob.file_path)
+    ).scalar()
+
+    # Содержимое одинаково, поэтому замена существующего файла безопасна
+    # и восстанавливает его, если он был утерян
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def release_blob(db: Session, sha256: str) -> bool:
+    """
+    -1 ссылка на блоб. Последняя ссылка удаляет строку блоба, файл и варианты.
+    Возвращает True, если блоб удалён. Коммит — за вызывающим.
+    """
+    remaining = db.execute(
+        update(PhotoBlob)
+        .where(PhotoBlob.sha256 == sha256)
+        .values(ref_count=PhotoBlob.ref_count - 1)
+        .returning(PhotoBlob.ref_count)
+    ).scalar()
+    if remaining is None or remaining > 0:
+        return False
+
+    file_path = db.execute(
+        delete(PhotoBlob).where(PhotoBlob.sha256 == sha256).returning(PhotoBlob.file_path)
+    ).scalar()
+    if file_path:
+        _remove_file(file_path)
+    return True
+
+
+def release_photo_files(db: Session, photo: Photo) -> None:
+    """
+    Освобождение файла удаляемого фото (блоб или файл старого формата).
+    Вызывать после flush удаления строки photos — иначе блоб не удалить по FK.
+    """
+    if photo.blob_sha256:
+        release_blob(db, photo.blob_sha256)
+    else:
+        _remove_file(photo.file_path)
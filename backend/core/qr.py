@@ -0,0 +1,37 @@
+# backend/core/qr.py
+"""
+QR-коды цифровых паспортов (ТЗ 2.2.3)
+
+Изображение не хранится в БД: оно рендерится при первом запросе
+GET /api/stops/{stop_id}/qr и кэшируется в LRU процесса по
+(номер паспорта, формат, размер). Результат детерминирован, поэтому
+кэш никогда не нужно инвалидировать.
+"""
+from functools import lru_cache
+import io
+
+import qrcode
+import qrcode.image.svg
+
+
+# Размер модуля QR (box_size) для вариантов размера
+QR_SIZES = {"s": 4, "m": 10, "l": 20}
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+@lru_cache(maxsize=1024)
+def render_qr(passport_number: str, fmt: str = "png", size: str = "m") -> bytes:
+    """PNG или SVG с данными "passport:<номер>" — синхронный, вызывать вне event loop"""
+    qr = qrcode.QRCode(version=1, box_size=QR_SIZES[size], border=4)
+    qr.add_data(f"passport:{passport_number}")
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(buffer)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -2,19 +2,44 @@
 """
 Безопасность: JWT токены, хеширование паролей, валидация
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 import re
 import secrets
+import threading
+import time
 
 from core.config import settings
 
 
-# Контекст для хеширования паролей (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Допустимый диапазон стоимости bcrypt (2^rounds итераций)
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+
+def build_password_context(scheme: str = settings.PASSWORD_HASH_SCHEME,
+                           bcrypt_rounds: int = settings.BCRYPT_ROUNDS) -> CryptContext:
+    """
+    Контекст хеширования паролей. Новые хеши — схемой scheme; bcrypt остаётся
+    для проверки старых хешей. Хеш другой схемы или bcrypt с другим числом
+    раундов считается устаревшим (needs_update) и пересчитывается при входе.
+    """
+    schemes = [scheme] if scheme == "bcrypt" else [scheme, "bcrypt"]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+    )
+
+
+# Единственный контекст хеширования паролей в приложении
+pwd_context = build_password_context()
 
 
 # ============== ПАРОЛИ ==============
@@ -24,11 +49,42 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверка пароля с пересчётом устаревшего хеша.
+    Возвращает (верен ли пароль, новый хеш или None, если хеш актуален).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Хеширование пароля"""
     return pwd_context.hash(password)
 
 
+def benchmark_bcrypt_rounds(target_ms: float, samples: int = 3) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Подбор стоимости bcrypt под целевое время хеширования на этой машине.
+    Возвращает (наибольшее число раундов не дольше target_ms, замеры [(раунды, мс)]).
+    Каждый раунд удваивает время, поэтому замер прекращается после превышения цели.
+    """
+    timings = []
+    chosen = BCRYPT_MIN_ROUNDS
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        context = build_password_context("bcrypt", rounds)
+        best = None
+        for _ in range(samples):
+            started = time.perf_counter()
+            context.hash("benchmark-password")
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append((rounds, round(best, 1)))
+        if best > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
 def validate_password_strength(password: str) -> Tuple[bool, str]:
     """
     Проверка надёжности пароля
@@ -98,23 +154,82 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """
+    LRU уже проверенных access токенов до их exp: повторный запрос с тем же
+    токеном не проверяет HMAC и не разбирает JSON. Ключ — подпись токена
+    (последний сегмент), при попадании сравнивается весь токен.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[str, dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = token.rpartition(".")[2]
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            cached_token, payload, expires_at = item
+            if expires_at <= time.time() or not secrets.compare_digest(cached_token, token):
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        if self.max_size <= 0 or "exp" not in payload:
+            return
+        key = token.rpartition(".")[2]
+        with self._lock:
+            self._data[key] = (token, payload, float(payload["exp"]))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+verified_tokens = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Проверенный payload токена, подписанного SECRET_KEY (из кэша или jwt.decode).
+    Тип токена не проверяется, в кэш попадают только access токены.
+    Бросает JWTError, если токен недействителен.
+    """
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("type") == "access":
+        verified_tokens.set(token, payload)
+    return payload
+
+
 def verify_access_token(token: str) -> dict:
     """Проверка Access Token"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        
-        if payload.get("type") != "access":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Неверный тип токена"
-            )
-        
-        return payload
+        payload = decode_access_token(token)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Недействительный токен"
         )
+    
+    if payload.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный тип токена"
+        )
+    
+    return payload
 
 
 def verify_refresh_token(token: str) -> dict:
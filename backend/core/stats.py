@@ -0,0 +1,225 @@
+# backend/core/stats.py
+"""
+Агрегаты по остановкам для /api/stops/stats и /api/reports/dashboard
+
+Счётчики материализованы в таблице stats_counters и поддерживаются
+инкрементально: обработчики create/update/delete/inspection вызывают
+apply_stats_delta() в той же транзакции, что и изменение остановки.
+Чтение (read_stats) — выборка пары десятков строк, не зависит от размера парка.
+
+Полный пересчёт (compute_stop_stats) идёт одним проходом по bus_stops:
+GROUP BY district + COUNT(*) FILTER (WHERE ...) по каждому статусу/состоянию.
+reconcile_stats() периодически перезаписывает им снапшот, исправляя дрейф.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import BusStop, StopStatus, Condition, StatsCounter
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(now: datetime = None) -> datetime:
+    """Первый день текущего месяца, 00:00"""
+    now = now or datetime.now()
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def compute_stop_stats(db: Session) -> dict:
+    """
+    Все счётчики дашборда за один запрос.
+
+    :return: {
+        "total": int,
+        "by_status": {"active": int, ...},
+        "by_condition": {"excellent": int, ...},
+        "inspected_this_month": int,
+        "by_district": {"Район": int, ...},
+    }
+    """
+    first_day = month_start()
+
+    columns = [
+        BusStop.district,
+        func.count(BusStop.id).label("total"),
+        func.count(BusStop.id).filter(BusStop.last_inspection_date >= first_day).label("inspected"),
+    ]
+    columns += [
+        func.count(BusStop.id).filter(BusStop.status == s).label(f"status_{s.value}")
+        for s in StopStatus
+    ]
+    columns += [
+        func.count(BusStop.id).filter(BusStop.condition == c).label(f"condition_{c.value}")
+        for c in Condition
+    ]
+
+    rows = db.query(*columns).group_by(BusStop.district).all()
+
+    return {
+        "total": sum(r.total for r in rows),
+        "by_status": {
+            s.value: sum(getattr(r, f"status_{s.value}") for r in rows) for s in StopStatus
+        },
+        "by_condition": {
+            c.value: sum(getattr(r, f"condition_{c.value}") for r in rows) for c in Condition
+        },
+        "inspected_this_month": sum(r.inspected for r in rows),
+        "by_district": {r.district: r.total for r in rows},
+    }
+
+
+# ============== МАТЕРИАЛИЗОВАННЫЕ СЧЁТЧИКИ ==============
+
+
+def _month_key(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m") if value else None
+
+
+def _enum_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def stop_stats_keys(stop) -> dict:
+    """Ключи счётчиков, в которые входит остановка"""
+    return {
+        "status": _enum_value(stop.status),
+        "condition": _enum_value(stop.condition),
+        "district": stop.district,
+        "inspected": _month_key(stop.last_inspection_date),
+    }
+
+
+def _upsert_deltas(db: Session, deltas: dict) -> None:
+    values = [
+        {"kind": kind, "key": key, "value": delta}
+        for (kind, key), delta in deltas.items() if delta
+    ]
+    if not values:
+        return
+
+    stmt = pg_insert(StatsCounter).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StatsCounter.kind, StatsCounter.key],
+        set_={"value": StatsCounter.value + stmt.excluded.value, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def _add_keys(deltas: dict, keys: dict, sign: int) -> None:
+    deltas[("total", "")] += sign
+    for kind, key in keys.items():
+        if key is not None:
+            deltas[(kind, key)] += sign
+
+
+def apply_stats_delta(db: Session, old: Optional[dict], new: Optional[dict]) -> None:
+    """
+    Инкрементальное обновление счётчиков одним UPSERT.
+    old=None — остановка создана, new=None — удалена.
+    Коммит — вместе с изменением остановки, на стороне вызывающего.
+    """
+    deltas = defaultdict(int)
+    if old is not None:
+        _add_keys(deltas, old, -1)
+    if new is not None:
+        _add_keys(deltas, new, 1)
+    _upsert_deltas(db, deltas)
+
+
+def apply_stats_bulk(db: Session, added: List[dict]) -> None:
+    """Счётчики для пачки созданных остановок (импорт) — один UPSERT на пачку"""
+    deltas = defaultdict(int)
+    for keys in added:
+        _add_keys(deltas, keys, 1)
+    _upsert_deltas(db, deltas)
+
+
+def reconcile_stats(db: Session) -> None:
+    """
+    Полный пересчёт снапшота из bus_stops.
+    EXCLUSIVE-блокировка ждёт незавершённые инкременты и не пускает новые
+    до коммита, поэтому снапшот согласован с данными.
+    """
+    db.execute(text("LOCK TABLE stats_counters IN EXCLUSIVE MODE"))
+
+    stats = compute_stop_stats(db)
+    months = db.query(
+        func.to_char(BusStop.last_inspection_date, "YYYY-MM"),
+        func.count(BusStop.id),
+    ).filter(
+        BusStop.last_inspection_date.isnot(None)
+    ).group_by(func.to_char(BusStop.last_inspection_date, "YYYY-MM")).all()
+
+    rows = [("total", "", stats["total"])]
+    rows += [("status", k, v) for k, v in stats["by_status"].items() if v]
+    rows += [("condition", k, v) for k, v in stats["by_condition"].items() if v]
+    rows += [("district", k, v) for k, v in stats["by_district"].items() if k is not None]
+    rows += [("inspected", k, v) for k, v in months]
+
+    db.query(StatsCounter).delete(synchronize_session=False)
+    db.bulk_insert_mappings(StatsCounter, [
+        {"kind": kind, "key": key, "value": value}
+        for kind, key, value in rows
+    ])
+    db.commit()
+
+
+def read_stats(db: Session) -> dict:
+    """
+    Счётчики из снапшота — формат как у compute_stop_stats плюс updated_at
+    (время последнего изменения снапшота). Пустой снапшот пересчитывается.
+    """
+    counters = db.query(StatsCounter).all()
+    if not counters:
+        reconcile_stats(db)
+        counters = db.query(StatsCounter).all()
+
+    current_month = _month_key(month_start())
+    stats = {
+        "total": 0,
+        "by_status": {s.value: 0 for s in StopStatus},
+        "by_condition": {c.value: 0 for c in Condition},
+        "inspected_this_month": 0,
+        "by_district": {},
+        "updated_at": max((c.updated_at for c in counters if c.updated_at), default=None),
+    }
+    for c in counters:
+        if c.kind == "total":
+            stats["total"] = c.value
+        elif c.kind == "status" and c.key in stats["by_status"]:
+            stats["by_status"][c.key] = c.value
+        elif c.kind == "condition" and c.key in stats["by_condition"]:
+            stats["by_condition"][c.key] = c.value
+        elif c.kind == "district" and c.value > 0:
+            stats["by_district"][c.key] = c.value
+        elif c.kind == "inspected" and c.key == current_month:
+            stats["inspected_this_month"] = c.value
+    return stats
+
+
+async def reconcile_stats_periodically(interval: int) -> None:
+    """Фоновая задача lifespan: периодический полный пересчёт снапшота"""
+    from database import SessionLocal
+
+    def _run():
+        db = SessionLocal()
+        try:
+            reconcile_stats(db)
+        except Exception as e:
+            logger.error(f"❌ Stats reconcile failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.to_thread(_run)
+        await asyncio.sleep(interval)
@@ -0,0 +1,121 @@
+# backend/core/stop_columns.py
+"""
+Колонки табличного представления остановок — общие для экспорта
+(routes/reports.py) и импорта (POST /api/stops/import).
+"""
+from typing import Any, Dict, List, Optional
+
+from schemas import BusStopCreate
+
+
+# (Заголовок в файле, поле BusStop) — порядок колонок экспорта
+STOP_COLUMNS = [
+    ("ID", "stop_id"),
+    ("№ Паспорта", "passport_number"),
+    ("Адрес", "address"),
+    ("Ориентир", "landmark"),
+    ("Район", "district"),
+    ("Маршруты", "routes"),
+    ("Широта", "latitude"),
+    ("Долгота", "longitude"),
+    ("Статус", "status"),
+    ("Состояние", "condition"),
+    ("Соответствие нормам", "meets_standards"),
+    ("Тип", "stop_type"),
+    ("Кол-во стоек", "legs_count"),
+    ("Год постройки", "year_built"),
+    ("Цвет", "paint_color"),
+    ("Состояние сидений", "seats_condition"),
+    ("Тип крыши", "roof_type"),
+    ("Состояние крыши", "roof_condition"),
+    ("Электропитание", "has_electricity"),
+    ("Урна", "has_bin"),
+    ("Последняя проверка", "last_inspection_date"),
+    ("Инспектор", "inspector_name"),
+]
+
+EXPORT_HEADERS = [header for header, _ in STOP_COLUMNS]
+
+STATUS_LABELS = {
+    "active": "Активна",
+    "repair": "В ремонте",
+    "dismantled": "Демонтирована",
+    "inactive": "Недоступна",
+}
+
+CONDITION_LABELS = {
+    "excellent": "Отличное",
+    "satisfactory": "Удовлетворительное",
+    "needs_repair": "Требует ремонта",
+    "critical": "Критическое",
+}
+
+
+# ============== ИМПОРТ ==============
+
+# Поля, которые выдаёт система или которых нет в BusStopCreate — при импорте игнорируются
+IMPORT_IGNORED_FIELDS = {"stop_id", "passport_number", "last_inspection_date", "inspector_name"}
+
+_CONDITION_FIELDS = {"condition", "seats_condition", "roof_condition", "bin_condition",
+                     "glass_condition", "glass_mount_condition"}
+_BOOL_FIELDS = {"meets_standards", "has_electricity", "has_bin", "has_roof_slif"}
+_FLOAT_FIELDS = {"latitude", "longitude"}
+_INT_FIELDS = {"legs_count", "year_built", "glass_replacement_count"}
+
+_STATUS_BY_LABEL = {label.lower(): value for value, label in STATUS_LABELS.items()}
+_CONDITION_BY_LABEL = {label.lower(): value for value, label in CONDITION_LABELS.items()}
+_BOOL_VALUES = {
+    "да": True, "yes": True, "true": True, "1": True,
+    "нет": False, "no": False, "false": False, "0": False,
+}
+
+# Заголовок файла (русский из экспорта или имя поля) → поле
+_HEADER_TO_FIELD = {header.lower(): field for header, field in STOP_COLUMNS}
+
+
+def map_import_header(headers: List[Any]) -> List[Optional[str]]:
+    """
+    Сопоставление заголовков файла полям BusStopCreate.
+    Принимаются заголовки экспорта и имена полей; неизвестные колонки → None.
+    """
+    known_fields = set(BusStopCreate.model_fields)
+    result = []
+    for header in headers:
+        name = str(header or "").strip().lower()
+        field = _HEADER_TO_FIELD.get(name, name)
+        result.append(field if field in known_fields and field not in IMPORT_IGNORED_FIELDS else None)
+    return result
+
+
+def _convert(field: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "":
+        return None
+
+    if field == "status":
+        return _STATUS_BY_LABEL.get(str(value).lower(), value)
+    if field in _CONDITION_FIELDS:
+        return _CONDITION_BY_LABEL.get(str(value).lower(), value)
+    if field in _BOOL_FIELDS and not isinstance(value, bool):
+        return _BOOL_VALUES.get(str(value).lower(), value)
+    if field in _FLOAT_FIELDS and isinstance(value, str):
+        return value.replace(",", ".")
+    if field in _INT_FIELDS and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def parse_import_row(fields: List[Optional[str]], values: List[Any]) -> Dict[str, Any]:
+    """
+    Строка файла → dict для BusStopCreate.
+    Пустые ячейки пропускаются, чтобы сработали значения по умолчанию схемы.
+    """
+    data = {}
+    for field, value in zip(fields, values):
+        if field is None:
+            continue
+        converted = _convert(field, value)
+        if converted is not None:
+            data[field] = converted
+    return data
@@ -0,0 +1,105 @@
+# backend/core/user_cache.py
+"""
+In-process кэш текущего пользователя для get_current_user
+
+Вместо строки users на каждый запрос хранится снимок (id, email, name,
+role, is_active) на USER_CACHE_TTL_SECONDS, не больше USER_CACHE_MAX_SIZE
+пользователей (LRU). Снимок неизменяем и не привязан к сессии БД —
+обработчикам, которым нужна сама строка users, её надо загрузить.
+
+Кэш живёт в памяти процесса: изменение и удаление пользователя вызывают
+invalidate() в своём воркере, остальные воркеры увидят изменения
+(в т.ч. деактивацию) не позже чем через TTL.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import User, UserRole
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    email: str
+    name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, row) -> "UserSnapshot":
+        """Снимок из строки select(...) или загруженного User"""
+        return cls(id=row.id, email=row.email, name=row.name, role=row.role, is_active=bool(row.is_active))
+
+
+class UserCache:
+    """Потокобезопасный LRU снимков пользователей с истечением записей"""
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    del self._data[user_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return item[0]
+
+    def set(self, snapshot: UserSnapshot) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[snapshot.id] = (snapshot, time.monotonic() + self.ttl)
+            self._data.move_to_end(snapshot.id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS, max_size=settings.USER_CACHE_MAX_SIZE)
+
+
+def load_user_snapshot(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    """Снимок из кэша или одним SELECT нужных колонок (результат кэшируется)"""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    row = db.execute(
+        select(User.id, User.email, User.name, User.role, User.is_active).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    snapshot = UserSnapshot.from_row(row)
+    user_cache.set(snapshot)
+    return snapshot
@@ -4,7 +4,6 @@ PostgreSQL + SQLAlchemy
 """
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from passlib.context import CryptContext
 import logging
 
 from core.config import settings
@@ -26,8 +25,6 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 def get_db():
     db = SessionLocal()
@@ -37,18 +34,11 @@ def get_db():
         db.close()
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
 def create_initial_data():
     """Создаёт начальные данные (admin + тестовые пользователи)"""
     # Импорт здесь, чтобы избежать circular import
     from models import User, UserRole
+    from core.hashing import password_hasher
 
     db = SessionLocal()
     try:
@@ -57,18 +47,24 @@ def create_initial_data():
             {"email": "inspector@jcdecaux.uz", "name": "Дилшод Рахимов", "role": UserRole.INSPECTOR, "password": "inspector123"},
             {"email": "viewer@jcdecaux.uz", "name": "Нодира Султанова", "role": UserRole.VIEWER, "password": "viewer123"},
         ]
-        for u in users_data:
-            existing = db.query(User).filter(User.email == u["email"]).first()
-            if not existing:
-                user = User(
-                    email=u["email"],
-                    name=u["name"],
-                    password_hash=get_password_hash(u["password"]),
-                    role=u["role"],
-                    is_active=True,
-                )
-                db.add(user)
-                logger.info(f"✅ Created user: {u['email']}")
+        existing = {
+            email for (email,) in db.query(User.email).filter(
+                User.email.in_([u["email"] for u in users_data])
+            )
+        }
+        missing = [u for u in users_data if u["email"] not in existing]
+        # Хеши считаются параллельно в пуле bcrypt
+        hashes = password_hasher.hash_many([u["password"] for u in missing])
+        for u, password_hash in zip(missing, hashes):
+            user = User(
+                email=u["email"],
+                name=u["name"],
+                password_hash=password_hash,
+                role=u["role"],
+                is_active=True,
+            )
+            db.add(user)
+            logger.info(f"✅ Created user: {u['email']}")
         db.commit()
     except Exception as e:
         logger.error(f"❌ Error creating initial data: {e}")
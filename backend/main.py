@@ -7,6 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 
@@ -22,9 +23,17 @@ from middleware import (
     SecurityMiddleware,
     error_handler,
 )
+from middleware.audit import audit_sink
 from routes import auth, users, stops, photos, reports, directories
-from database import engine, Base, create_initial_data
+from database import engine, Base, SessionLocal, create_initial_data
 from core.config import settings
+from core.export_jobs import fail_orphaned_jobs, shutdown_export_workers
+from core.id_allocator import sync_id_counters
+from core.hashing import password_hasher
+from core.images import shutdown_image_workers
+from core.partitions import ensure_partitions
+from core.stats import reconcile_stats_periodically
+from core.user_cache import user_cache
 
 
 os.makedirs("logs", exist_ok=True)
@@ -38,10 +47,29 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Bus Stop Inventory API...")
     Base.metadata.create_all(bind=engine)
     logger.info("✅ Database tables created")
+    try:
+        ensure_partitions(engine)
+        logger.info("✅ Log partitions ensured")
+    except Exception as e:
+        # Без новых секций строки пишутся в <таблица>_default — не повод не стартовать
+        logger.error(f"❌ Log partitions not ensured (python manage_partitions.py ensure): {e}")
     create_initial_data()
     logger.info("✅ Initial data created")
+    with SessionLocal() as db:
+        sync_id_counters(db)
+    fail_orphaned_jobs()
+    stats_task = asyncio.create_task(
+        reconcile_stats_periodically(settings.STATS_RECONCILE_INTERVAL_SECONDS)
+    )
+    audit_sink.start()
     yield
     logger.info("👋 Shutting down...")
+    stats_task.cancel()
+    shutdown_export_workers()
+    shutdown_image_workers()
+    password_hasher.shutdown()
+    await audit_sink.stop()
+    logger.info("✅ Audit log flushed")
 
 
 app = FastAPI(
@@ -91,11 +119,7 @@ app.add_middleware(
 
 app.add_middleware(LoggingMiddleware)
 
-app.add_middleware(
-    AuthMiddleware,
-    secret_key=settings.SECRET_KEY,
-    algorithm=settings.ALGORITHM,
-)
+app.add_middleware(AuthMiddleware)
 
 # ============== ERROR HANDLERS ==============
 error_handler(app)
@@ -120,6 +144,9 @@ async def health_check():
         "status": "healthy",
         "version": "1.0.0",
         "service": "Bus Stop Inventory API",
+        "audit": audit_sink.metrics(),
+        "password_hashing": password_hasher.metrics(),
+        "user_cache": user_cache.metrics(),
     }
 
 
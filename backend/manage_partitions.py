@@ -0,0 +1,62 @@
+"""
+Обслуживание помесячных секций audit_logs и change_logs (core/partitions.py).
+
+Запуск:
+    python manage_partitions.py status              — секции и оценка числа строк
+    python manage_partitions.py ensure [--ahead N]  — создать секции на N месяцев вперёд
+    python manage_partitions.py migrate             — перевести старые таблицы в секционированные
+    python manage_partitions.py archive [--dry-run] — выгрузить и удалить секции старше срока хранения
+
+Пример для cron (1-е число месяца):
+    0 4 1 * * cd /path/to/backend && python manage_partitions.py ensure && python manage_partitions.py archive
+"""
+import argparse
+
+from database import engine
+from core.config import settings
+from core.partitions import (
+    PARTITIONED_TABLES, archive_expired, ensure_partitions,
+    migrate_to_partitioned, partition_report,
+)
+
+
+def status():
+    for table, partitions in partition_report(engine).items():
+        if not partitions:
+            print(f"{table}: не секционирована (python manage_partitions.py migrate)")
+            continue
+        print(f"{table}:")
+        for name, rows in partitions:
+            print(f"  {name:<32} ~{rows}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Секции audit_logs / change_logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    ensure = sub.add_parser("ensure")
+    ensure.add_argument("--ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    sub.add_parser("migrate")
+    archive = sub.add_parser("archive")
+    archive.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status()
+    elif args.command == "ensure":
+        for table, created in ensure_partitions(engine, args.ahead).items():
+            print(f"{table}: создано секций {created}")
+    elif args.command == "migrate":
+        for table in PARTITIONED_TABLES:
+            moved = migrate_to_partitioned(engine, table)
+            print(f"{table}: перенесено строк {moved}")
+    elif args.command == "archive":
+        names = archive_expired(engine, dry_run=args.dry_run)
+        action = "К архивации" if args.dry_run else "Архивировано"
+        print(f"{action}: {', '.join(names) if names else 'нет секций'}")
+        if names and not args.dry_run:
+            print(f"Файлы: {settings.ARCHIVE_DIR}/<секция>.csv.gz")
+
+
+if __name__ == "__main__":
+    main()
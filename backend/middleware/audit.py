@@ -1,13 +1,30 @@
 # backend/middleware/audit.py
 """
 Аудит: логирование всех действий пользователей
+
+Записи не коммитятся в сессии запроса: AuditLogger кладёт их в очередь
+AuditSink, а фоновая задача пишет пачками (INSERT ... VALUES) раз в
+AUDIT_FLUSH_INTERVAL_MS или по достижении AUDIT_BATCH_SIZE записей.
+Очередь ограничена AUDIT_QUEUE_MAX_SIZE — при переполнении записи
+отбрасываются и учитываются в метриках (audit_sink.metrics()).
+Если sink не запущен (скрипты, тесты) — запись идёт синхронно в сессию.
 """
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
-from models import AuditLog, User
+from core.config import settings
+from core.user_cache import UserSnapshot
+from models import AuditLog
+
+logger = logging.getLogger(__name__)
 
 
 def _serialize(value):
@@ -21,6 +38,156 @@ def _serialize(value):
     return value
 
 
+class AuditSink:
+    """Буферизованная асинхронная запись AuditLog"""
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval_ms: int):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+        # Метрики
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_lag_ms = 0.0
+        self.last_flush_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запуск фоновой задачи (lifespan, внутри event loop)"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Досылает всё, что осталось в очереди, и останавливает задачу"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+
+    def submit(self, record: dict) -> bool:
+        """
+        Постановка записи в очередь без ожидания.
+        False — sink не запущен (вызывающий пишет синхронно).
+        """
+        if not self.running:
+            return False
+        record["_enqueued"] = time.monotonic()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._put(record)
+        else:
+            self._loop.call_soon_threadsafe(self._put, record)
+        return True
+
+    def _put(self, record: dict) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"⚠️ Audit queue full, dropped {dropped} records so far")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[dict]) -> None:
+        from database import SessionLocal
+
+        now = time.monotonic()
+        lag_ms = (now - min(r.pop("_enqueued") for r in batch)) * 1000
+        db = SessionLocal()
+        try:
+            db.execute(insert(AuditLog).values(batch))
+            db.commit()
+            with self._lock:
+                self.written += len(batch)
+                self.last_lag_ms = round(lag_ms, 2)
+                self.last_flush_at = datetime.utcnow()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Audit batch write failed ({len(batch)} records), retrying one by one: {e}")
+            self._write_each(db, batch, lag_ms)
+        finally:
+            db.close()
+
+    def _write_each(self, db, batch: List[dict], lag_ms: float) -> None:
+        """
+        Запись пачки по одной строке после ошибки пакетного INSERT:
+        одна некорректная запись не должна уносить с собой остальные.
+        """
+        written = 0
+        for record in batch:
+            try:
+                db.execute(insert(AuditLog).values(record))
+                db.commit()
+                written += 1
+            except Exception as e:
+                db.rollback()
+                logger.error(
+                    f"❌ Audit record dropped ({record.get('action')} "
+                    f"{record.get('resource_type')}/{record.get('resource_id')}): {e}"
+                )
+        with self._lock:
+            self.written += written
+            self.failed += len(batch) - written
+            if written:
+                self.last_lag_ms = round(lag_ms, 2)
+                self.last_flush_at = datetime.utcnow()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "last_lag_ms": self.last_lag_ms,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+        }
+
+
+audit_sink = AuditSink(
+    max_queue=settings.AUDIT_QUEUE_MAX_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+)
+
+
 class AuditLogger:
     """
     Логгер для записи всех действий пользователей в БД
@@ -29,13 +196,14 @@ class AuditLogger:
     @staticmethod
     def log(
         db: Session,
-        user: Optional[User],
+        user: Optional[UserSnapshot],
         action: str,
         resource_type: str,
         resource_id: Optional[str] = None,
         details: Optional[dict] = None,
         ip_address: Optional[str] = None,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        commit: bool = True
     ):
         """
         Запись действия в журнал аудита
@@ -48,8 +216,10 @@ class AuditLogger:
         :param details: Дополнительные данные
         :param ip_address: IP адрес клиента
         :param user_agent: User-Agent браузера
+        :param commit: для синхронного режима (sink не запущен): False — только
+                       добавить в сессию, коммит делает вызывающий
         """
-        audit_log = AuditLog(
+        record = dict(
             user_id=user.id if user else None,
             user_email=user.email if user else "anonymous",
             action=action,
@@ -61,11 +231,15 @@ class AuditLogger:
             timestamp=datetime.utcnow()
         )
         
-        db.add(audit_log)
-        db.commit()
+        if audit_sink.submit(record):
+            return
+        
+        db.add(AuditLog(**record))
+        if commit:
+            db.commit()
     
     @staticmethod
-    def log_login(db: Session, user: User, ip_address: str, success: bool):
+    def log_login(db: Session, user: UserSnapshot, ip_address: str, success: bool):
         """Логирование входа в систему"""
         AuditLogger.log(
             db=db,
@@ -78,7 +252,7 @@ class AuditLogger:
         )
     
     @staticmethod
-    def log_logout(db: Session, user: User, ip_address: str):
+    def log_logout(db: Session, user: UserSnapshot, ip_address: str):
         """Логирование выхода из системы"""
         AuditLogger.log(
             db=db,
@@ -91,7 +265,7 @@ class AuditLogger:
     @staticmethod
     def log_create(
         db: Session,
-        user: User,
+        user: UserSnapshot,
         resource_type: str,
         resource_id: str,
         data: dict,
@@ -111,12 +285,13 @@ class AuditLogger:
     @staticmethod
     def log_update(
         db: Session,
-        user: User,
+        user: UserSnapshot,
         resource_type: str,
         resource_id: str,
         old_data: dict,
         new_data: dict,
-        ip_address: str
+        ip_address: str,
+        commit: bool = True
     ):
         """Логирование обновления ресурса"""
         # Находим изменённые поля
@@ -136,13 +311,14 @@ class AuditLogger:
                 resource_type=resource_type,
                 resource_id=resource_id,
                 details={"changes": changes},
-                ip_address=ip_address
+                ip_address=ip_address,
+                commit=commit
             )
     
     @staticmethod
     def log_delete(
         db: Session,
-        user: User,
+        user: UserSnapshot,
         resource_type: str,
         resource_id: str,
         data: dict,
@@ -162,7 +338,7 @@ class AuditLogger:
     @staticmethod
     def log_export(
         db: Session,
-        user: User,
+        user: UserSnapshot,
         export_type: str,
         filters: dict,
         ip_address: str
@@ -6,24 +6,28 @@ Auth Middleware
 для логирования/аудита/удобства.
 
 Если токен отсутствует или невалиден — запрос НЕ блокируется (доступ контролируют Depends).
+
+Проверенный payload в request.state.jwt переиспользует get_current_user,
+поэтому токен проверяется один раз за запрос (а при попадании в кэш
+проверенных токенов core/security.py — ни разу).
 """
 
 from typing import Optional
 
-from fastapi import Request
-from jose import jwt, JWTError
-from starlette.middleware.base import BaseHTTPMiddleware
+from jose import JWTError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.security import decode_access_token
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, secret_key: str, algorithm: str = "HS256"):
-        super().__init__(app)
-        self.secret_key = secret_key
-        self.algorithm = algorithm
+class AuthMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
     @staticmethod
-    def _get_bearer_token(request: Request) -> Optional[str]:
-        auth = request.headers.get("Authorization") or request.headers.get("authorization")
+    def _get_bearer_token(headers: Headers) -> Optional[str]:
+        auth = headers.get("Authorization")
         if not auth:
             return None
         parts = auth.split()
@@ -31,28 +35,32 @@ class AuthMiddleware(BaseHTTPMiddleware):
             return None
         return parts[1].strip()
 
-    async def dispatch(self, request: Request, call_next):
-        # defaults
-        request.state.jwt = None
-        request.state.user_id = None
-        request.state.user_email = None
-        request.state.user_role = None
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        token = self._get_bearer_token(request)
+        # defaults (request.state читает scope["state"])
+        state = scope.setdefault("state", {})
+        state["jwt"] = None
+        state["user_id"] = None
+        state["user_email"] = None
+        state["user_role"] = None
+
+        token = self._get_bearer_token(Headers(scope=scope))
         if token:
             try:
-                payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+                payload = decode_access_token(token)
                 # Только access токены
                 if payload.get("type") == "access":
-                    request.state.jwt = payload
-                    request.state.user_id = payload.get("sub")
-                    request.state.user_email = payload.get("email")
-                    request.state.user_role = payload.get("role")
+                    state["jwt"] = payload
+                    state["user_id"] = payload.get("sub")
+                    state["user_email"] = payload.get("email")
+                    state["user_role"] = payload.get("role")
             except JWTError:
                 # Не блокируем запрос — доступ проверяется в Depends
                 pass
             except Exception:
                 pass
 
-        return await call_next(request)
-
+        await self.app(scope, receive, send)
@@ -1,19 +1,31 @@
 """Request/Response logging middleware"""
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 import time
 import uuid
 
 logger = logging.getLogger("api.requests")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class LoggingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         request_id = str(uuid.uuid4())[:8]
         start = time.time()
-        response = await call_next(request)
-        duration = round((time.time() - start) * 1000, 2)
-        logger.info(f"[{request_id}] {request.method} {request.url.path} -> {response.status_code} ({duration}ms)")
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time"] = str(duration)
-        return response
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                duration = round((time.time() - start) * 1000, 2)
+                logger.info(f"[{request_id}] {scope['method']} {scope['path']} -> {message['status']} ({duration}ms)")
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = str(duration)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
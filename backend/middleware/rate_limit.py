@@ -2,17 +2,29 @@
 Rate Limiting Middleware
 Защита от DDoS и brute-force атак
 """
-from fastapi import Request, HTTPException, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing import Dict, Tuple
 from datetime import datetime, timedelta
 import asyncio
 from collections import defaultdict
 import hashlib
+import re
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Производные изображения фото (immutable, кэшируются браузером): список,
+# карта и карточка остановки загружают десятки превью за раз
+PHOTO_VARIANT_PATH = re.compile(r"^/api/photos/[^/]+/variants/[^/]+$")
+
+# Куски и статус возобновляемой загрузки: upload_id (uuid hex) не
+# нормализуется в {id}, поэтому лимит считается на каждую загрузку
+RESUMABLE_SESSION_PATH = re.compile(r"^/api/photos/resumable/[^/]+$")
+
+
+class RateLimitMiddleware:
     """
     Middleware для ограничения количества запросов
     
@@ -25,7 +37,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self, 
-        app,
+        app: ASGIApp,
         default_limit: int = 100,
         default_window: int = 60,
         login_limit: int = 5,
@@ -33,7 +45,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         upload_limit: int = 10,
         upload_window: int = 60,
     ):
-        super().__init__(app)
+        self.app = app
         self.default_limit = default_limit
         self.default_window = default_window
         self.login_limit = login_limit
@@ -50,14 +62,18 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Запускаем очистку старых записей
         self._cleanup_task = None
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Получаем идентификатор клиента
-        client_key = self._get_client_key(request)
-        path = request.url.path
+        client_key = self._get_client_key(HTTPConnection(scope))
+        path = scope["path"]
         
         # Проверяем не заблокирован ли IP
         if self._is_blocked(client_key):
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": "Слишком много запросов. IP временно заблокирован.",
@@ -66,9 +82,16 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
                 headers={"Retry-After": "300"}
             )
+            await response(scope, receive, send)
+            return
+        
+        # Чтение превью не ограничивается
+        if self._is_exempt(scope["method"], path):
+            await self.app(scope, receive, send)
+            return
         
         # Определяем лимиты для данного endpoint
-        limit, window = self._get_limits(path)
+        limit, window = self._get_limits(scope["method"], path)
         
         # Проверяем лимит
         if not self._check_rate_limit(client_key, path, limit, window):
@@ -76,7 +99,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             if "/auth/login" in path:
                 self._block_ip(client_key)
             
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": f"Превышен лимит запросов. Попробуйте через {window} секунд.",
@@ -85,21 +108,25 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
                 headers={"Retry-After": str(window)}
             )
+            await response(scope, receive, send)
+            return
         
         # Записываем запрос
         self._record_request(client_key, path)
         
         # Добавляем заголовки о лимитах в ответ
-        response = await call_next(request)
-        
-        remaining = self._get_remaining(client_key, path, limit, window)
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(window)
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                remaining = self._get_remaining(client_key, path, limit, window)
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(limit)
+                headers["X-RateLimit-Remaining"] = str(remaining)
+                headers["X-RateLimit-Reset"] = str(window)
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_wrapper)
     
-    def _get_client_key(self, request: Request) -> str:
+    def _get_client_key(self, request: HTTPConnection) -> str:
         """Получает уникальный ключ клиента (IP + User-Agent)"""
         # Получаем реальный IP (учитываем прокси)
         forwarded = request.headers.get("X-Forwarded-For")
@@ -114,10 +141,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         key = f"{ip}:{user_agent}"
         return hashlib.md5(key.encode()).hexdigest()
     
-    def _get_limits(self, path: str) -> Tuple[int, int]:
+    def _is_exempt(self, method: str, path: str) -> bool:
+        """Запросы без лимита: GET/HEAD вариантов фото"""
+        return method in ("GET", "HEAD") and PHOTO_VARIANT_PATH.match(path) is not None
+    
+    def _get_limits(self, method: str, path: str) -> Tuple[int, int]:
         """Возвращает лимиты для конкретного endpoint"""
         if "/auth/login" in path:
             return self.login_limit, self.login_window
+        elif method in ("GET", "PUT") and RESUMABLE_SESSION_PATH.match(path):
+            # Лимит загрузок расходует только создание сессии
+            return self.default_limit, self.default_window
         elif "/upload" in path or "/photos" in path:
             return self.upload_limit, self.upload_window
         else:
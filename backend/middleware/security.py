@@ -2,9 +2,10 @@
 Security Middleware
 Заголовки безопасности и защита от атак
 """
-from fastapi import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing import Set, Dict, Tuple
 from datetime import datetime, timedelta
 import re
@@ -82,55 +83,66 @@ SUSPICIOUS_PATTERNS = [
 COMPILED_PATTERNS = [re.compile(p, re.IGNORECASE) for p in SUSPICIOUS_PATTERNS]
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
+class SecurityMiddleware:
     """
     Middleware для защиты от XSS, SQL-injection, clickjacking
     """
 
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enable_xss_protection: bool = True,
         enable_sql_injection_protection: bool = True,
         allowed_hosts: Set[str] = None,
     ):
-        super().__init__(app)
+        self.app = app
         self.enable_xss_protection = enable_xss_protection
         self.enable_sql_injection_protection = enable_sql_injection_protection
         self.allowed_hosts = allowed_hosts or {"*"}
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = HTTPConnection(scope)
         if not self._check_host(request):
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=400,
                 content={"detail": "Invalid host header", "code": "INVALID_HOST"}
             )
+            await response(scope, receive, send)
+            return
 
         if self.enable_sql_injection_protection:
             if self._check_suspicious_patterns(request):
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=400,
                     content={"detail": "Suspicious request detected", "code": "SUSPICIOUS_REQUEST"}
                 )
-
-        response = await call_next(request)
-
-        # Заголовки безопасности
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=()"
-
-        return response
-
-    def _check_host(self, request: Request) -> bool:
+                await response(scope, receive, send)
+                return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Заголовки безопасности
+                headers = MutableHeaders(scope=message)
+                headers["X-Content-Type-Options"] = "nosniff"
+                headers["X-Frame-Options"] = "DENY"
+                headers["X-XSS-Protection"] = "1; mode=block"
+                headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+                headers["Permissions-Policy"] = "geolocation=(), microphone=()"
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _check_host(self, request: HTTPConnection) -> bool:
         if "*" in self.allowed_hosts:
             return True
         host = request.headers.get("host", "").split(":")[0]
         return host in self.allowed_hosts
 
-    def _check_suspicious_patterns(self, request: Request) -> bool:
+    def _check_suspicious_patterns(self, request: HTTPConnection) -> bool:
         url_str = str(request.url)
         for pattern in COMPILED_PATTERNS:
             if pattern.search(url_str):
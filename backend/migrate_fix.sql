@@ -6,3 +6,21 @@
 -- Изменяем тип qr_code с VARCHAR(255) на TEXT
 -- (base64 PNG QR-кода намного длиннее 255 символов)
 ALTER TABLE bus_stops ALTER COLUMN qr_code TYPE TEXT;
+
+
+-- ============================================================
+-- Миграция: хранилище фото по хэшу содержимого (core/photo_storage.py)
+-- Таблицу photo_blobs создаёт приложение при старте (create_all),
+-- колонку в существующей таблице photos нужно добавить вручную
+-- ============================================================
+
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS blob_sha256 VARCHAR(64) REFERENCES photo_blobs(sha256);
+CREATE INDEX IF NOT EXISTS ix_photos_blob_sha256 ON photos(blob_sha256);
+
+
+-- ============================================================
+-- Миграция: время запуска фонового экспорта (core/export_jobs.py)
+-- Для export_jobs, созданной приложением до появления колонки
+-- ============================================================
+
+ALTER TABLE export_jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP;
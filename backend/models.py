@@ -155,7 +155,8 @@ class BusStop(Base):
     inspector_name = Column(String(255), nullable=True)
     next_inspection_date = Column(DateTime, nullable=True)
 
-    # QR-код (ТЗ 2.2.3) — base64 PNG, поэтому Text вместо String(255)
+    # QR-код (ТЗ 2.2.3) — устаревшее хранилище base64 PNG, больше не заполняется:
+    # изображение рендерится по запросу (core/qr.py, GET /api/stops/{stop_id}/qr)
     qr_code = Column(Text, nullable=True)
 
     created_at = Column(DateTime, default=func.now())
@@ -197,6 +198,9 @@ class Photo(Base):
 
     is_main = Column(Boolean, default=False)
 
+    # Файл в хранилище по хэшу (core/photo_storage.py); NULL — фото до хранилища
+    blob_sha256 = Column(String(64), ForeignKey("photo_blobs.sha256"), nullable=True, index=True)
+
     uploaded_at = Column(DateTime, default=func.now())
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     uploader_name = Column(String(255), nullable=True)
@@ -204,13 +208,51 @@ class Photo(Base):
     bus_stop = relationship("BusStop", back_populates="photos")
 
 
+class UploadSession(Base):
+    """
+    Незавершённая возобновляемая загрузка фото (POST /api/photos/upload/{stop_id}/resumable).
+    Данные копятся в uploads/tmp/<id>.part, received_bytes — подтверждённое смещение.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    bus_stop_id = Column(Integer, ForeignKey("bus_stops.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    original_filename = Column(String(255), nullable=False)
+    mime_type = Column(String(50), nullable=True)
+    is_main = Column(Boolean, default=False)
+
+    total_size = Column(Integer, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    received_bytes = Column(Integer, nullable=False, default=0)
+    # SHA-256 принятых кусков по порядку и (необязательно) всего файла от клиента
+    chunk_checksums = Column(JSON, nullable=False, default=list)
+    sha256 = Column(String(64), nullable=True)
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class PhotoBlob(Base):
+    """Уникальное содержимое фото; ref_count — число строк photos, ссылающихся на него"""
+    __tablename__ = "photo_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=True)
+    mime_type = Column(String(50), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=func.now())
+
+
 # ============== ЖУРНАЛ ИЗМЕНЕНИЙ ==============
 
 
 class ChangeLog(Base):
     __tablename__ = "change_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     bus_stop_id = Column(
         Integer, ForeignKey("bus_stops.id", ondelete="CASCADE"), nullable=False
     )
@@ -222,12 +264,16 @@ class ChangeLog(Base):
     old_value = Column(Text, nullable=True)
     new_value = Column(Text, nullable=True)
 
-    changed_at = Column(DateTime, default=func.now())
+    # Ключ помесячного секционирования (core/partitions.py) — входит в PK
+    changed_at = Column(DateTime, primary_key=True, default=func.now())
     ip_address = Column(String(45), nullable=True)
 
     bus_stop = relationship("BusStop", back_populates="change_logs")
 
-    __table_args__ = (Index("idx_change_logs_stop_date", "bus_stop_id", "changed_at"),)
+    __table_args__ = (
+        Index("idx_change_logs_stop_date", "bus_stop_id", "changed_at"),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
 
 
 # ============== АУДИТ ==============
@@ -236,7 +282,7 @@ class ChangeLog(Base):
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     user_email = Column(String(255), nullable=True)
     action = Column(String(50), nullable=False)
@@ -245,14 +291,84 @@ class AuditLog(Base):
     details = Column(JSON, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
-    timestamp = Column(DateTime, default=func.now(), index=True)
+    # Ключ помесячного секционирования (core/partitions.py) — входит в PK
+    timestamp = Column(DateTime, primary_key=True, default=func.now(), index=True)
 
     __table_args__ = (
         Index("idx_audit_logs_user_date", "user_id", "timestamp"),
         Index("idx_audit_logs_action", "action", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
 
 
+# ============== СЧЁТЧИКИ ДАШБОРДА ==============
+
+
+class StatsCounter(Base):
+    """
+    Материализованные счётчики дашборда (core/stats.py).
+    kind: total | status | condition | district | inspected (key = "YYYY-MM")
+    """
+    __tablename__ = "stats_counters"
+
+    kind = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True, default="")
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+# ============== ФОНОВЫЙ ЭКСПОРТ ==============
+
+
+class ExportJob(Base):
+    """
+    Задача фонового экспорта (core/export_jobs.py).
+    status: pending | running | done | failed; файл — exports/<file_name>
+    """
+    __tablename__ = "export_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    format = Column(String(10), nullable=False)
+    filters = Column(JSON, nullable=False, default=dict)
+    # sha1(автор + формат + фильтры + версия данных) — повторный запрос отдаёт готовый файл
+    cache_key = Column(String(40), nullable=False, index=True)
+
+    status = Column(String(20), nullable=False, default="pending")
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    file_name = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Переход в running: ожидание в очереди пула не считается потерей задачи
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# ============== СЧЁТЧИКИ ИДЕНТИФИКАТОРОВ ==============
+
+
+class IdCounter(Base):
+    """
+    Последний выданный номер для серии идентификаторов (core/id_allocator.py).
+    name: "stop" (BS-001) или "passport:<год>" (TP-2024-0001)
+    """
+    __tablename__ = "id_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class IdFreeSlot(Base):
+    """Освободившиеся номера для повторной выдачи (если ID_REUSE_GAPS включён)"""
+    __tablename__ = "id_free_slots"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, primary_key=True)
+
+
 # ============== СПРАВОЧНИКИ ==============
 
 
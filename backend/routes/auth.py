@@ -9,9 +9,11 @@ import hashlib
 from database import get_db
 from models import User, RefreshToken
 from schemas import LoginRequest, TokenResponse, RefreshTokenRequest, UserResponse, UserInToken
-from core.security import verify_password, get_password_hash, create_tokens, verify_refresh_token
+from core.security import get_password_hash, create_tokens, verify_refresh_token
+from core.hashing import password_hasher
 from core.config import settings
 from core.dependencies import get_current_user
+from core.user_cache import UserSnapshot
 from middleware.security import brute_force_protection
 from middleware.audit import AuditLogger
 
@@ -49,7 +51,11 @@ async def login(
 
     user = db.query(User).filter(User.email == login_data.email).first()
 
-    if not user or not verify_password(login_data.password, user.password_hash):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(login_data.password, user.password_hash)
+
+    if not valid:
         brute_force_protection.record_attempt(client_ip, success=False)
         remaining_attempts = brute_force_protection.get_remaining_attempts(client_ip)
         raise HTTPException(
@@ -73,6 +79,9 @@ async def login(
     user.failed_login_attempts = 0
     user.locked_until = None
     user.last_login = datetime.utcnow()
+    # Хеш старой схемы или стоимости пересчитывается без сброса пароля
+    if new_hash:
+        user.password_hash = new_hash
 
     tokens = create_tokens(user.id, user.email, user.role.value)
 
@@ -87,7 +96,7 @@ async def login(
     db.commit()
 
     brute_force_protection.record_attempt(client_ip, success=True)
-    AuditLogger.log_login(db, user, client_ip, success=True)
+    AuditLogger.log_login(db, UserSnapshot.from_row(user), client_ip, success=True)
 
     # FIX: Добавляем user объект в ответ — frontend его ожидает
     return {
@@ -152,7 +161,7 @@ async def refresh_token(
 async def logout(
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     refresh_data: RefreshTokenRequest = None,   # FIX: сделан опциональным
 ):
     """
@@ -177,7 +186,7 @@ async def logout(
 async def logout_all(
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     db.query(RefreshToken).filter(
         RefreshToken.user_id == current_user.id,
@@ -188,14 +197,18 @@ async def logout_all(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_me(
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    # Снимок из кэша не содержит last_login / created_at
+    return db.get(User, current_user.id)
 
 
 @router.get("/sessions")
 async def get_sessions(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     sessions = db.query(RefreshToken).filter(
         RefreshToken.user_id == current_user.id,
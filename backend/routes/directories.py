@@ -12,10 +12,12 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from core.cache import cached_json_response, directory_cache
 from core.dependencies import require_admin, require_any_role
+from core.user_cache import UserSnapshot
 from database import get_db
 from middleware.audit import AuditLogger
-from models import District, Route, User, CustomField
+from models import District, Route, CustomField
 
 
 # Префикс "/api/directories" задаётся в main.py, поэтому здесь без "/directories"
@@ -81,22 +83,24 @@ class RouteResponse(RouteBase):
 
 @router.get("/districts/public", response_model=List[DistrictResponse])
 async def list_districts_public(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role),
+    current_user: UserSnapshot = Depends(require_any_role),
 ):
     """Публичный список активных районов (доступен всем авторизованным пользователям)"""
-    return (
-        db.query(District)
+    return cached_json_response(request, "districts:public", lambda: [
+        DistrictResponse.model_validate(d)
+        for d in db.query(District)
         .filter(District.is_active == True)
         .order_by(District.name.asc())
         .all()
-    )
+    ])
 
 
 @router.get("/districts", response_model=List[DistrictResponse])
 async def list_districts(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     return (
         db.query(District)
@@ -110,7 +114,7 @@ async def create_district(
     payload: DistrictCreate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     existing = db.query(District).filter(District.name == payload.name).first()
     if existing:
@@ -123,6 +127,7 @@ async def create_district(
     db.add(district)
     db.commit()
     db.refresh(district)
+    directory_cache.invalidate("districts:")
 
     AuditLogger.log_create(
         db=db,
@@ -142,7 +147,7 @@ async def update_district(
     payload: DistrictUpdate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     district = db.query(District).filter(District.id == district_id).first()
     if not district:
@@ -167,6 +172,7 @@ async def update_district(
 
     db.commit()
     db.refresh(district)
+    directory_cache.invalidate("districts:")
 
     new_data = {"name": district.name, "is_active": district.is_active}
 
@@ -188,7 +194,7 @@ async def delete_district(
     district_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     district = db.query(District).filter(District.id == district_id).first()
     if not district:
@@ -197,6 +203,7 @@ async def delete_district(
     data = {"name": district.name, "is_active": district.is_active}
     db.delete(district)
     db.commit()
+    directory_cache.invalidate("districts:")
 
     AuditLogger.log_delete(
         db=db,
@@ -215,14 +222,16 @@ async def delete_district(
 
 @router.get("/routes", response_model=List[RouteResponse])
 async def list_routes(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
-    return (
-        db.query(Route)
+    return cached_json_response(request, "routes:all", lambda: [
+        RouteResponse.model_validate(r)
+        for r in db.query(Route)
         .order_by(Route.is_active.desc(), Route.number.asc())
         .all()
-    )
+    ])
 
 
 @router.post("/routes", response_model=RouteResponse, status_code=status.HTTP_201_CREATED)
@@ -230,7 +239,7 @@ async def create_route(
     payload: RouteCreate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     existing = db.query(Route).filter(Route.number == payload.number).first()
     if existing:
@@ -247,6 +256,7 @@ async def create_route(
     db.add(route)
     db.commit()
     db.refresh(route)
+    directory_cache.invalidate("routes:")
 
     AuditLogger.log_create(
         db=db,
@@ -266,7 +276,7 @@ async def update_route(
     payload: RouteUpdate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     route = db.query(Route).filter(Route.id == route_id).first()
     if not route:
@@ -293,6 +303,7 @@ async def update_route(
 
     db.commit()
     db.refresh(route)
+    directory_cache.invalidate("routes:")
 
     new_data = {
         "number": route.number,
@@ -318,7 +329,7 @@ async def delete_route(
     route_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     route = db.query(Route).filter(Route.id == route_id).first()
     if not route:
@@ -327,6 +338,7 @@ async def delete_route(
     data = {"number": route.number, "name": route.name, "is_active": route.is_active}
     db.delete(route)
     db.commit()
+    directory_cache.invalidate("routes:")
 
     AuditLogger.log_delete(
         db=db,
@@ -374,22 +386,24 @@ class CustomFieldResponse(CustomFieldBase):
 
 @router.get("/custom-fields/public", response_model=List[CustomFieldResponse])
 async def list_custom_fields_public(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role),
+    current_user: UserSnapshot = Depends(require_any_role),
 ):
     """Список активных характеристик (для всех авторизованных)"""
-    return (
-        db.query(CustomField)
+    return cached_json_response(request, "custom_fields:public", lambda: [
+        CustomFieldResponse.model_validate(f)
+        for f in db.query(CustomField)
         .filter(CustomField.is_active == True)
         .order_by(CustomField.sort_order.asc(), CustomField.name.asc())
         .all()
-    )
+    ])
 
 
 @router.get("/custom-fields", response_model=List[CustomFieldResponse])
 async def list_custom_fields(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     return (
         db.query(CustomField)
@@ -403,7 +417,7 @@ async def create_custom_field(
     payload: CustomFieldCreate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     existing = db.query(CustomField).filter(CustomField.name == payload.name).first()
     if existing:
@@ -413,6 +427,7 @@ async def create_custom_field(
     db.add(field)
     db.commit()
     db.refresh(field)
+    directory_cache.invalidate("custom_fields:")
 
     AuditLogger.log_create(
         db=db, user=current_user, resource_type="custom_field",
@@ -428,7 +443,7 @@ async def update_custom_field(
     payload: CustomFieldUpdate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     field = db.query(CustomField).filter(CustomField.id == field_id).first()
     if not field:
@@ -441,6 +456,7 @@ async def update_custom_field(
 
     db.commit()
     db.refresh(field)
+    directory_cache.invalidate("custom_fields:")
 
     AuditLogger.log_update(
         db=db, user=current_user, resource_type="custom_field",
@@ -456,7 +472,7 @@ async def delete_custom_field(
     field_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ):
     field = db.query(CustomField).filter(CustomField.id == field_id).first()
     if not field:
@@ -465,6 +481,7 @@ async def delete_custom_field(
     data = {"name": field.name, "field_type": field.field_type}
     db.delete(field)
     db.commit()
+    directory_cache.invalidate("custom_fields:")
 
     AuditLogger.log_delete(
         db=db, user=current_user, resource_type="custom_field",
@@ -2,24 +2,36 @@
 """
 Маршруты для работы с фотографиями
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import asyncio
+import hashlib
+import logging
 import os
 import uuid
-import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from database import get_db
-from models import BusStop, Photo, User
-from schemas import PhotoResponse
+from models import BusStop, Photo, UploadSession
+from schemas import PhotoResponse, ResumableUploadInit, ResumableUploadStatus
 from core.config import settings
 from core.dependencies import get_current_user, require_admin_or_inspector
+from core.images import PHOTO_VARIANTS, ensure_variants, variant_media_type, variant_path
+from core.photo_storage import TMP_DIR, acquire_blob, new_temp_path, release_photo_files
+from core.user_cache import UserSnapshot
 from middleware.audit import AuditLogger
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["Фотографии"])
 
+# Размер куска при записи загрузки на диск
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def get_client_ip(request: Request) -> str:
     forwarded = request.headers.get("X-Forwarded-For")
@@ -30,8 +42,13 @@ def get_client_ip(request: Request) -> str:
 
 def validate_file(file: UploadFile) -> None:
     """Валидация загружаемого файла"""
+    validate_upload(file.filename, file.content_type)
+
+
+def validate_upload(filename: str, content_type: Optional[str]) -> None:
+    """Проверка расширения и MIME-типа (обычная и возобновляемая загрузка)"""
     # Проверяем расширение
-    ext = file.filename.split(".")[-1].lower() if "." in file.filename else ""
+    ext = filename.split(".")[-1].lower() if "." in filename else ""
     if ext not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -40,41 +57,107 @@ def validate_file(file: UploadFile) -> None:
     
     # Проверяем MIME тип
     allowed_mimes = ["image/jpeg", "image/png", "image/webp"]
-    if file.content_type not in allowed_mimes:
+    if content_type not in allowed_mimes:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Недопустимый тип файла"
         )
 
 
-def save_file(file: UploadFile, stop_id: str) -> tuple:
-    """Сохранение файла на диск"""
-    # Создаём директорию если не существует
-    upload_dir = os.path.join(settings.UPLOAD_DIR, stop_id)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Генерируем уникальное имя файла
-    ext = file.filename.split(".")[-1].lower()
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    file_path = os.path.join(upload_dir, filename)
+def _file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Файл слишком большой. Максимум: {settings.MAX_FILE_SIZE_MB} МБ"
+    )
+
+
+def _write_limited(src, tmp_path: str, max_size: int) -> tuple:
+    """
+    Копирование загрузки во временный файл кусками с проверкой размера
+    и подсчётом SHA-256 по ходу записи. Синхронная — вызывается в threadpool.
+    Недописанный файл удаляется. Возвращает (размер, sha256).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _file_too_large()
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size, digest.hexdigest()
+
+
+async def save_file(file: UploadFile) -> tuple:
+    """
+    Сохранение загрузки во временный файл (вне event loop).
+    Возвращает (временный путь, размер, sha256); в хранилище файл
+    переносит create_photo_record.
+    """
+    max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
     
-    # Сохраняем файл
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Размер уже известен после разбора multipart — отказываем без копирования
+    if file.size is not None and file.size > max_size:
+        raise _file_too_large()
     
-    # Получаем размер файла
-    file_size = os.path.getsize(file_path)
+    tmp_path = new_temp_path()
+    file_size, sha256 = await run_in_threadpool(_write_limited, file.file, tmp_path, max_size)
     
-    # Проверяем размер
-    max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-    if file_size > max_size:
-        os.remove(file_path)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Файл слишком большой. Максимум: {settings.MAX_FILE_SIZE_MB} МБ"
-        )
+    return tmp_path, file_size, sha256
+
+
+def create_photo_record(
+    db: Session,
+    stop: BusStop,
+    user: UserSnapshot,
+    tmp_path: str,
+    file_size: int,
+    sha256: str,
+    original_filename: str,
+    mime_type: Optional[str],
+    is_main: bool = False
+) -> Photo:
+    """
+    Перенос файла в хранилище по хэшу (+1 ссылка на блоб) и новая строка photos.
+    Коммит — за вызывающим.
+    """
+    ext = original_filename.split(".")[-1].lower() if "." in original_filename else "jpg"
+    file_path = acquire_blob(db, sha256, tmp_path, ext, file_size, mime_type)
     
-    return filename, file_path, file_size
+    photo = Photo(
+        bus_stop_id=stop.id,
+        filename=os.path.basename(file_path),
+        original_filename=original_filename,
+        file_path=file_path,
+        file_size=file_size,
+        mime_type=mime_type,
+        is_main=is_main,
+        blob_sha256=sha256,
+        uploaded_by=user.id,
+        uploader_name=user.name
+    )
+    db.add(photo)
+    return photo
+
+
+async def build_variants(file_path: str) -> None:
+    """
+    Превью и WebP сразу после загрузки. Ошибка не отменяет загрузку:
+    варианты будут созданы при первом запросе.
+    """
+    try:
+        await ensure_variants(file_path)
+    except Exception as e:
+        logger.warning(f"⚠️ Photo variants for {file_path} failed: {e}")
 
 
 @router.post("/upload/{stop_id}", response_model=PhotoResponse)
@@ -84,7 +167,7 @@ async def upload_photo(
     file: UploadFile = File(...),
     is_main: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     """
     Загрузка фото для остановки
@@ -101,7 +184,7 @@ async def upload_photo(
     validate_file(file)
     
     # Сохраняем файл
-    filename, file_path, file_size = save_file(file, stop_id)
+    tmp_path, file_size, sha256 = await save_file(file)
     
     # Если это главное фото, убираем флаг с других
     if is_main:
@@ -111,21 +194,13 @@ async def upload_photo(
         ).update({"is_main": False})
     
     # Создаём запись в БД
-    photo = Photo(
-        bus_stop_id=stop.id,
-        filename=filename,
-        original_filename=file.filename,
-        file_path=file_path,
-        file_size=file_size,
-        mime_type=file.content_type,
-        is_main=is_main,
-        uploaded_by=current_user.id,
-        uploader_name=current_user.name
+    photo = create_photo_record(
+        db, stop, current_user, tmp_path, file_size, sha256,
+        file.filename, file.content_type, is_main=is_main
     )
-    
-    db.add(photo)
     db.commit()
     db.refresh(photo)
+    await build_variants(photo.file_path)
     
     # Логируем
     AuditLogger.log_create(
@@ -135,7 +210,7 @@ async def upload_photo(
         resource_id=str(photo.id),
         data={
             "stop_id": stop_id,
-            "filename": filename,
+            "filename": photo.filename,
             "file_size": file_size
         },
         ip_address=get_client_ip(request)
@@ -150,7 +225,7 @@ async def upload_multiple_photos(
     request: Request,
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     """
     Массовая загрузка фото
@@ -170,36 +245,37 @@ async def upload_multiple_photos(
             detail="Максимум 10 файлов за раз"
         )
     
+    async def store(file: UploadFile) -> tuple:
+        validate_file(file)
+        return await save_file(file)
+    
+    # Файлы пишутся на диск параллельно, записи в БД добавляются последовательно
+    results = await asyncio.gather(*(store(file) for file in files), return_exceptions=True)
+    
     uploaded = []
     errors = []
-    
-    for file in files:
-        try:
-            validate_file(file)
-            filename, file_path, file_size = save_file(file, stop_id)
-            
-            photo = Photo(
-                bus_stop_id=stop.id,
-                filename=filename,
-                original_filename=file.filename,
-                file_path=file_path,
-                file_size=file_size,
-                mime_type=file.content_type,
-                is_main=False,
-                uploaded_by=current_user.id,
-                uploader_name=current_user.name
-            )
-            
-            db.add(photo)
-            uploaded.append(file.filename)
-            
-        except HTTPException as e:
-            errors.append({"filename": file.filename, "error": e.detail})
-        except Exception as e:
-            errors.append({"filename": file.filename, "error": str(e)})
+    file_paths = []
+    
+    for file, result in zip(files, results):
+        if isinstance(result, HTTPException):
+            errors.append({"filename": file.filename, "error": result.detail})
+            continue
+        if isinstance(result, Exception):
+            errors.append({"filename": file.filename, "error": str(result)})
+            continue
+        
+        tmp_path, file_size, sha256 = result
+        photo = create_photo_record(
+            db, stop, current_user, tmp_path, file_size, sha256,
+            file.filename, file.content_type
+        )
+        uploaded.append(file.filename)
+        file_paths.append(photo.file_path)
     
     db.commit()
     
+    await asyncio.gather(*(build_variants(path) for path in set(file_paths)))
+    
     # Логируем
     AuditLogger.log_create(
         db=db,
@@ -221,12 +297,294 @@ async def upload_multiple_photos(
     }
 
 
+# ============== ВОЗОБНОВЛЯЕМАЯ ЗАГРУЗКА ==============
+#
+# 1. POST /upload/{stop_id}/resumable — начало, ответ: upload_id и chunk_size
+# 2. PUT /resumable/{upload_id}?offset=N — кусок (тело — байты, заголовок
+#    X-Chunk-SHA256); offset должен совпадать с received_bytes
+# 3. GET /resumable/{upload_id} — подтверждённое смещение после обрыва связи
+# 4. POST /resumable/{upload_id}/complete — проверка и создание Photo
+
+
+def _upload_tmp_path(upload_id: str) -> str:
+    return os.path.join(TMP_DIR, f"{upload_id}.part")
+
+
+def _upload_status(upload: UploadSession) -> dict:
+    return {
+        "upload_id": upload.id,
+        "filename": upload.original_filename,
+        "total_size": upload.total_size,
+        "chunk_size": upload.chunk_size,
+        "received_bytes": upload.received_bytes,
+        "chunks_received": len(upload.chunk_checksums or []),
+        "complete": upload.received_bytes >= upload.total_size,
+    }
+
+
+def _get_upload(db: Session, upload_id: str, user: UserSnapshot, for_update: bool = False) -> UploadSession:
+    query = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user.id
+    )
+    if for_update:
+        query = query.with_for_update()
+    upload = query.first()
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Загрузка не найдена или истекла"
+        )
+    return upload
+
+
+def _purge_expired_uploads(db: Session) -> None:
+    cutoff = datetime.now() - timedelta(hours=settings.RESUMABLE_UPLOAD_TTL_HOURS)
+    expired = db.query(UploadSession).filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        path = _upload_tmp_path(upload.id)
+        if os.path.exists(path):
+            os.remove(path)
+        db.delete(upload)
+    if expired:
+        db.commit()
+
+
+async def _read_chunk(request: Request, limit: int) -> bytes:
+    """Тело запроса целиком, но не больше limit байт"""
+    data = bytearray()
+    async for piece in request.stream():
+        data.extend(piece)
+        if len(data) > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Кусок больше {limit} байт"
+            )
+    return bytes(data)
+
+
+def _write_chunk(path: str, offset: int, data: bytes) -> None:
+    """Запись куска по смещению; всё, что было после offset (обрыв), отбрасывается"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        os.ftruncate(fd, offset)
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@router.post("/upload/{stop_id}/resumable", response_model=ResumableUploadStatus)
+async def init_resumable_upload(
+    stop_id: str,
+    data: ResumableUploadInit,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """
+    Начало возобновляемой загрузки фото (для нестабильной мобильной сети)
+    """
+    stop = db.query(BusStop).filter(BusStop.stop_id == stop_id).first()
+    if not stop:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Остановка не найдена"
+        )
+    
+    validate_upload(data.filename, data.content_type)
+    if data.total_size > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+        raise _file_too_large()
+    
+    _purge_expired_uploads(db)
+    os.makedirs(TMP_DIR, exist_ok=True)
+    
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        bus_stop_id=stop.id,
+        user_id=current_user.id,
+        original_filename=data.filename,
+        mime_type=data.content_type,
+        is_main=data.is_main,
+        total_size=data.total_size,
+        chunk_size=settings.RESUMABLE_CHUNK_SIZE_KB * 1024,
+        received_bytes=0,
+        chunk_checksums=[],
+        sha256=data.sha256.lower() if data.sha256 else None,
+    )
+    db.add(upload)
+    db.commit()
+    
+    return _upload_status(upload)
+
+
+@router.get("/resumable/{upload_id}", response_model=ResumableUploadStatus)
+async def get_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """
+    Состояние загрузки: с received_bytes продолжается отправка после обрыва
+    """
+    return _upload_status(_get_upload(db, upload_id, current_user))
+
+
+@router.put("/resumable/{upload_id}", response_model=ResumableUploadStatus)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    x_chunk_sha256: str = Header(...),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """
+    Приём куска. Куски идут по порядку, все (кроме последнего) размером chunk_size.
+    Повтор уже принятого куска с той же контрольной суммой — не ошибка.
+    """
+    upload = _get_upload(db, upload_id, current_user)
+    # Тело читается до блокировки строки: мобильная сеть может быть медленной
+    data = await _read_chunk(request, upload.chunk_size)
+    db.refresh(upload, with_for_update=True)
+    checksum = x_chunk_sha256.lower()
+    index = offset // upload.chunk_size
+    checksums = list(upload.chunk_checksums or [])
+    
+    if hashlib.sha256(data).hexdigest() != checksum:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Контрольная сумма куска не совпадает"
+        )
+    
+    # Повтор после потерянного ответа
+    if offset < upload.received_bytes and index < len(checksums) and checksums[index] == checksum:
+        db.rollback()
+        return _upload_status(upload)
+    
+    if offset != upload.received_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ожидается offset={upload.received_bytes}"
+        )
+    
+    is_last = offset + len(data) == upload.total_size
+    if not data or offset + len(data) > upload.total_size or (len(data) != upload.chunk_size and not is_last):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный размер куска"
+        )
+    
+    await run_in_threadpool(_write_chunk, _upload_tmp_path(upload.id), offset, data)
+    
+    checksums.append(checksum)
+    upload.chunk_checksums = checksums
+    upload.received_bytes = offset + len(data)
+    db.commit()
+    
+    return _upload_status(upload)
+
+
+@router.post("/resumable/{upload_id}/complete", response_model=PhotoResponse)
+async def complete_resumable_upload(
+    upload_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """
+    Завершение загрузки: проверка размера и SHA-256, создание Photo
+    (как в POST /upload/{stop_id})
+    """
+    upload = _get_upload(db, upload_id, current_user, for_update=True)
+    if upload.received_bytes != upload.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Получено {upload.received_bytes} из {upload.total_size} байт"
+        )
+    
+    tmp_path = _upload_tmp_path(upload.id)
+    sha256 = await run_in_threadpool(_hash_file, tmp_path)
+    if upload.sha256 and upload.sha256 != sha256:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Контрольная сумма файла не совпадает"
+        )
+    
+    stop = db.query(BusStop).filter(BusStop.id == upload.bus_stop_id).first()
+    if not stop:
+        # Остановку удалили во время загрузки
+        db.delete(upload)
+        db.commit()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Остановка не найдена"
+        )
+    
+    if upload.is_main:
+        db.query(Photo).filter(
+            Photo.bus_stop_id == stop.id,
+            Photo.is_main == True
+        ).update({"is_main": False})
+    
+    photo = create_photo_record(
+        db, stop, current_user, tmp_path, upload.total_size, sha256,
+        upload.original_filename, upload.mime_type, is_main=upload.is_main
+    )
+    db.delete(upload)
+    db.commit()
+    db.refresh(photo)
+    await build_variants(photo.file_path)
+    
+    AuditLogger.log_create(
+        db=db,
+        user=current_user,
+        resource_type="photo",
+        resource_id=str(photo.id),
+        data={
+            "stop_id": stop.stop_id,
+            "filename": photo.filename,
+            "file_size": photo.file_size,
+            "resumable": True
+        },
+        ip_address=get_client_ip(request)
+    )
+    
+    return photo
+
+
+@router.delete("/resumable/{upload_id}")
+async def abort_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """Отмена загрузки и удаление принятых данных"""
+    upload = _get_upload(db, upload_id, current_user, for_update=True)
+    path = _upload_tmp_path(upload.id)
+    if os.path.exists(path):
+        os.remove(path)
+    db.delete(upload)
+    db.commit()
+    return {"message": "Загрузка отменена"}
+
+
 @router.put("/{photo_id}/set-main")
 async def set_main_photo(
     photo_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     """
     Установка главного фото
@@ -257,7 +615,7 @@ async def delete_photo(
     photo_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     """
     Удаление фото
@@ -270,10 +628,6 @@ async def delete_photo(
             detail="Фото не найдено"
         )
     
-    # Удаляем файл
-    if os.path.exists(photo.file_path):
-        os.remove(photo.file_path)
-    
     # Сохраняем данные для аудита
     photo_data = {
         "filename": photo.filename,
@@ -281,6 +635,9 @@ async def delete_photo(
     }
     
     db.delete(photo)
+    db.flush()
+    # Файл удаляется вместе с последней ссылкой на него
+    release_photo_files(db, photo)
     db.commit()
     
     # Логируем
@@ -300,7 +657,7 @@ async def delete_photo(
 async def get_stop_photos(
     stop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """
     Получение фото остановки
@@ -318,3 +675,45 @@ async def get_stop_photos(
     ).order_by(Photo.is_main.desc(), Photo.uploaded_at.desc()).all()
     
     return photos
+
+
+@router.get("/{photo_id}/variants/{variant}")
+async def get_photo_variant(
+    photo_id: int,
+    variant: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Уменьшенная копия фото (thumb, medium, thumb_webp, medium_webp).
+    Без авторизации, как и /uploads: URL используется в <img>.
+    Отсутствующий вариант создаётся при первом запросе.
+    """
+    if variant not in PHOTO_VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Неизвестный вариант изображения"
+        )
+    
+    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    if not photo or not os.path.exists(photo.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Фото не найдено"
+        )
+    
+    path = variant_path(photo.file_path, variant)
+    if not os.path.exists(path):
+        try:
+            await ensure_variants(photo.file_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Photo variants for {photo.file_path} failed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Не удалось обработать изображение"
+            )
+    
+    return FileResponse(
+        path,
+        media_type=variant_media_type(variant),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -3,18 +3,26 @@
 Маршруты для отчётов и экспорта
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from datetime import datetime, timedelta
-import io
-import csv
+import os
+import tempfile
 
-from database import get_db
-from models import BusStop, User, AuditLog
-from schemas import StatsResponse, ReportFilter
+from database import SessionLocal, get_db
+from models import BusStop, AuditLog, ExportJob
+from schemas import StatsResponse, ReportFilter, ExportJobCreate, ExportJobResponse
 from core.dependencies import get_current_user, require_any_role
+from core.export import (
+    XLSX_MEDIA_TYPE, count_export_rows, export_select, iter_csv, iter_export_rows, write_xlsx,
+)
+from core.export_jobs import job_to_dict, submit_export_job
+from core.pagination import apply_keyset, count_rows, decode_cursor, encode_cursor
+from core.stats import read_stats
+from core.user_cache import UserSnapshot
 from middleware.audit import AuditLogger
 
 
@@ -31,37 +39,26 @@ def get_client_ip(request: Request) -> str:
 @router.get("/dashboard")
 async def get_dashboard_data(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     """
     Данные для дашборда
     """
-    # Общая статистика
-    total = db.query(BusStop).count()
-    active = db.query(BusStop).filter(BusStop.status == "active").count()
-    repair = db.query(BusStop).filter(BusStop.status == "repair").count()
-    dismantled = db.query(BusStop).filter(BusStop.status == "dismantled").count()
-    inactive = db.query(BusStop).filter(BusStop.status == "inactive").count()
-    
-    # По состоянию
-    excellent = db.query(BusStop).filter(BusStop.condition == "excellent").count()
-    satisfactory = db.query(BusStop).filter(BusStop.condition == "satisfactory").count()
-    needs_repair = db.query(BusStop).filter(BusStop.condition == "needs_repair").count()
-    critical = db.query(BusStop).filter(BusStop.condition == "critical").count()
-    
-    # Проверено за этот месяц
-    first_day = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    inspected = db.query(BusStop).filter(
-        BusStop.last_inspection_date >= first_day
-    ).count()
-    
-    # По районам
-    districts = db.query(
-        BusStop.district,
-        func.count(BusStop.id)
-    ).group_by(BusStop.district).all()
-    
-    by_district = [{"name": d[0], "value": d[1]} for d in districts]
+    # Все счётчики — из материализованного снапшота (core/stats.py)
+    stats = read_stats(db)
+    by_status, by_condition = stats["by_status"], stats["by_condition"]
+
+    active = by_status["active"]
+    repair = by_status["repair"]
+    dismantled = by_status["dismantled"]
+    inactive = by_status["inactive"]
+
+    excellent = by_condition["excellent"]
+    satisfactory = by_condition["satisfactory"]
+    needs_repair = by_condition["needs_repair"]
+    critical = by_condition["critical"]
+
+    by_district = [{"name": name, "value": value} for name, value in stats["by_district"].items()]
     
     # Требуют внимания (критическое или требует ремонта)
     attention_needed = db.query(BusStop).filter(
@@ -73,7 +70,7 @@ async def get_dashboard_data(
     
     return {
         "stats": {
-            "total": total,
+            "total": stats["total"],
             "active": active,
             "repair": repair,
             "dismantled": dismantled,
@@ -82,8 +79,9 @@ async def get_dashboard_data(
             "satisfactory": satisfactory,
             "needs_repair": needs_repair,
             "critical": critical,
-            "inspected_this_month": inspected
+            "inspected_this_month": stats["inspected_this_month"]
         },
+        "stats_updated_at": stats["updated_at"],
         "by_district": by_district,
         "by_status": [
             {"name": "Активна", "value": active, "color": "#22c55e"},
@@ -119,106 +117,44 @@ async def export_report(
     status: Optional[str] = None,
     condition: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     """
     Экспорт данных в Excel/CSV
     """
-    # Формируем запрос
-    query = db.query(BusStop)
-    
-    if district:
-        query = query.filter(BusStop.district == district)
-    
-    if status:
-        query = query.filter(BusStop.status == status)
-    
-    if condition:
-        query = query.filter(BusStop.condition == condition)
-    
-    stops = query.order_by(BusStop.stop_id).all()
+    filters = {"district": district, "status": status, "condition": condition}
     
     # Логируем экспорт
     AuditLogger.log_export(
         db=db,
         user=current_user,
         export_type=format,
-        filters={
-            "district": district,
-            "status": status,
-            "condition": condition,
-            "count": len(stops)
-        },
+        filters={**filters, "count": count_export_rows(db, **filters)},
         ip_address=get_client_ip(request)
     )
     
     if format == "csv":
-        return export_csv(stops)
+        return export_csv(filters)
     else:
-        return export_xlsx(stops)
+        return await export_xlsx(db, filters)
 
 
-def export_csv(stops):
-    """Экспорт в CSV"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Заголовки
-    headers = [
-        "ID", "№ Паспорта", "Адрес", "Ориентир", "Район", "Маршруты",
-        "Широта", "Долгота", "Статус", "Состояние", "Соответствие нормам",
-        "Тип", "Кол-во стоек", "Год постройки", "Цвет",
-        "Состояние сидений", "Тип крыши", "Состояние крыши",
-        "Электропитание", "Урна", "Последняя проверка", "Инспектор"
-    ]
-    writer.writerow(headers)
-    
-    # Данные
-    status_labels = {
-        "active": "Активна",
-        "repair": "В ремонте",
-        "dismantled": "Демонтирована",
-        "inactive": "Недоступна"
-    }
-    
-    condition_labels = {
-        "excellent": "Отличное",
-        "satisfactory": "Удовлетворительное",
-        "needs_repair": "Требует ремонта",
-        "critical": "Критическое"
-    }
-    
-    for stop in stops:
-        row = [
-            stop.stop_id,
-            stop.passport_number or "",
-            stop.address,
-            stop.landmark or "",
-            stop.district,
-            stop.routes or "",
-            stop.latitude,
-            stop.longitude,
-            status_labels.get(stop.status.value, stop.status.value) if stop.status else "",
-            condition_labels.get(stop.condition.value, stop.condition.value) if stop.condition else "",
-            "Да" if stop.meets_standards else "Нет",
-            stop.stop_type.value if stop.stop_type else "",
-            stop.legs_count,
-            stop.year_built or "",
-            stop.paint_color or "",
-            condition_labels.get(stop.seats_condition.value, "") if stop.seats_condition else "",
-            stop.roof_type.value if stop.roof_type else "",
-            condition_labels.get(stop.roof_condition.value, "") if stop.roof_condition else "",
-            "Да" if stop.has_electricity else "Нет",
-            "Да" if stop.has_bin else "Нет",
-            stop.last_inspection_date.strftime("%d.%m.%Y") if stop.last_inspection_date else "",
-            stop.inspector_name or ""
-        ]
-        writer.writerow(row)
-    
-    output.seek(0)
-    
+def _csv_stream(filters: dict):
+    """
+    Тело CSV-ответа. Сессия своя: сессия get_db закрывается
+    до отправки StreamingResponse.
+    """
+    db = SessionLocal()
+    try:
+        yield from iter_csv(iter_export_rows(db, export_select(**filters)))
+    finally:
+        db.close()
+
+
+def export_csv(filters: dict):
+    """Экспорт в CSV — потоково, без загрузки всей выборки в память"""
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _csv_stream(filters),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename=bus_stops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -226,122 +162,77 @@ def export_csv(stops):
     )
 
 
-def export_xlsx(stops):
-    """Экспорт в Excel (XLSX)"""
+def _xlsx_tempfile(db: Session, filters: dict) -> str:
+    """XLSX во временный файл (синхронно — вызывать в threadpool)"""
+    fd, path = tempfile.mkstemp(prefix="bus_stops_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_xlsx(iter_export_rows(db, export_select(**filters)), path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def export_xlsx(db: Session, filters: dict):
+    """Экспорт в Excel (XLSX) — write_only во временный файл, отдаётся с диска"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        import openpyxl  # noqa: F401
     except ImportError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Модуль openpyxl не установлен"
         )
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Остановки"
+    path = await run_in_threadpool(_xlsx_tempfile, db, filters)
     
-    # Стили
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"bus_stops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        background=BackgroundTask(os.remove, path),
     )
+
+
+@router.post("/export/jobs", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    request: Request,
+    data: ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    """
+    Фоновый экспорт: возвращает задачу, статус которой опрашивается
+    через GET /export/jobs/{job_id}. Готовый файл — по download_url.
+    """
+    filters = {"district": data.district, "status": data.status, "condition": data.condition}
+    job, cached = await run_in_threadpool(submit_export_job, db, current_user, data.format, filters)
     
-    # Заголовки
-    headers = [
-        "ID", "№ Паспорта", "Адрес", "Ориентир", "Район", "Маршруты",
-        "Широта", "Долгота", "Статус", "Состояние", "Соответствие нормам",
-        "Тип", "Кол-во стоек", "Год постройки", "Цвет",
-        "Состояние сидений", "Тип крыши", "Состояние крыши",
-        "Электропитание", "Урна", "Последняя проверка", "Инспектор"
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Данные
-    status_labels = {
-        "active": "Активна",
-        "repair": "В ремонте",
-        "dismantled": "Демонтирована",
-        "inactive": "Недоступна"
-    }
-    
-    condition_labels = {
-        "excellent": "Отличное",
-        "satisfactory": "Удовлетворительное",
-        "needs_repair": "Требует ремонта",
-        "critical": "Критическое"
-    }
-    
-    for row_num, stop in enumerate(stops, 2):
-        data = [
-            stop.stop_id,
-            stop.passport_number or "",
-            stop.address,
-            stop.landmark or "",
-            stop.district,
-            stop.routes or "",
-            stop.latitude,
-            stop.longitude,
-            status_labels.get(stop.status.value, stop.status.value) if stop.status else "",
-            condition_labels.get(stop.condition.value, stop.condition.value) if stop.condition else "",
-            "Да" if stop.meets_standards else "Нет",
-            stop.stop_type.value if stop.stop_type else "",
-            stop.legs_count,
-            stop.year_built or "",
-            stop.paint_color or "",
-            condition_labels.get(stop.seats_condition.value, "") if stop.seats_condition else "",
-            stop.roof_type.value if stop.roof_type else "",
-            condition_labels.get(stop.roof_condition.value, "") if stop.roof_condition else "",
-            "Да" if stop.has_electricity else "Нет",
-            "Да" if stop.has_bin else "Нет",
-            stop.last_inspection_date.strftime("%d.%m.%Y") if stop.last_inspection_date else "",
-            stop.inspector_name or ""
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row_num, column=col, value=value)
-            cell.border = thin_border
-            cell.alignment = Alignment(vertical="center")
-    
-    # Автоширина колонок
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column].width = adjusted_width
-    
-    # Закрепляем заголовок
-    ws.freeze_panes = "A2"
-    
-    # Сохраняем в буфер
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=bus_stops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        }
+    AuditLogger.log_export(
+        db=db,
+        user=current_user,
+        export_type=data.format,
+        filters={**filters, "job_id": job.id, "cached": cached},
+        ip_address=get_client_ip(request)
     )
+    
+    return job_to_dict(job, cached=cached)
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    """Статус и прогресс задачи экспорта (автор задачи или админ)"""
+    job = db.get(ExportJob, job_id)
+    if job is None or (job.user_id != current_user.id and current_user.role.value != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача экспорта не найдена"
+        )
+    return job_to_dict(job)
 
 
 @router.get("/audit-log")
@@ -353,11 +244,19 @@ async def get_audit_log(
     resource_type: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
+    use_cursor: bool = False,
+    cursor: Optional[str] = None,
+    count: str = Query("estimated", regex="^(exact|estimated|none)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     """
     Журнал аудита (только для админа)
+
+    Keyset-режим (use_cursor=true или cursor) листает по (timestamp, id)
+    от новых к старым и возвращает next_cursor. total по умолчанию —
+    оценка (pg_class.reltuples без фильтров, иначе подсчёт до 10000 строк),
+    точное значение — count=exact.
     """
     if current_user.role.value != "admin":
         raise HTTPException(
@@ -382,11 +281,22 @@ async def get_audit_log(
     if date_to:
         query = query.filter(AuditLog.timestamp <= date_to)
     
-    total = query.count()
-    
-    logs = query.order_by(AuditLog.timestamp.desc()).offset(
-        (page - 1) * per_page
-    ).limit(per_page).all()
+    filtered = any(v is not None for v in (user_id, action, resource_type, date_from, date_to))
+    total, total_is_exact = count_rows(query, count, "audit_logs", filtered)
+    
+    next_cursor = None
+    if use_cursor or cursor:
+        after = decode_cursor(cursor, "timestamp", "desc") if cursor else None
+        logs = apply_keyset(
+            query, AuditLog.timestamp, AuditLog.id, "desc", after
+        ).limit(per_page + 1).all()
+        if len(logs) > per_page:
+            logs = logs[:per_page]
+            next_cursor = encode_cursor("timestamp", "desc", logs[-1].timestamp, logs[-1].id)
+    else:
+        logs = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).offset(
+            (page - 1) * per_page
+        ).limit(per_page).all()
     
     return {
         "logs": [
@@ -404,7 +314,9 @@ async def get_audit_log(
             for log in logs
         ],
         "total": total,
-        "page": page,
+        "total_is_exact": total_is_exact,
+        "page": None if (use_cursor or cursor) else page,
         "per_page": per_page,
-        "pages": (total + per_page - 1) // per_page
+        "pages": (total + per_page - 1) // per_page if total is not None else None,
+        "next_cursor": next_cursor,
     }
@@ -1,26 +1,45 @@
 """
 Маршруты для работы с остановками
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, defer, joinedload
+from sqlalchemy import or_, func, text, insert
+from typing import Iterator, Optional, List
 from datetime import datetime
-import qrcode
 import io
-import base64
+import csv
+import json
 
 from database import get_db
-from models import BusStop, ChangeLog, User, CustomFieldValue
+from models import BusStop, ChangeLog, CustomFieldValue, StopStatus
 from schemas import (
     BusStopCreate, BusStopUpdate, BusStopResponse,
     BusStopListResponse, StatsResponse, ChangeLogResponse
 )
+from core.cache import cached_json_response, directory_cache
+from core.change_tracking import collect_changes, write_change_logs
 from core.dependencies import (
     get_current_user,
     require_admin_or_inspector,
     require_any_role
 )
+from core.geo import (
+    BBox, CLUSTER_GRID, CLUSTER_MAX_ZOOM, MAX_POINTS_PER_VIEWPORT,
+    is_valid_tile, tile_to_bbox,
+)
+from core.http_cache import etag_matches, make_etag, not_modified
+from core.id_allocator import (
+    next_passport_number, next_stop_id, release_ids,
+    reserve_passport_numbers, reserve_stop_ids,
+)
+from core.pagination import apply_keyset, count_rows, decode_cursor, encode_cursor
+from core.photo_storage import release_photo_files
+from core.qr import QR_MEDIA_TYPES, render_qr
+from core.stats import apply_stats_bulk, apply_stats_delta, read_stats, stop_stats_keys
+from core.stop_columns import map_import_header, parse_import_row
+from core.user_cache import UserSnapshot
 from middleware.audit import AuditLogger
 
 
@@ -36,51 +55,13 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-def generate_stop_id(db: Session) -> str:
-    existing = {
-        s.stop_id for s in db.query(BusStop.stop_id).all()
-    }
-    num = 1
-    while True:
-        candidate = f"BS-{str(num).zfill(3)}"
-        if candidate not in existing:
-            return candidate
-        num += 1
-
-
-def generate_passport_number(db: Session) -> str:
-    year = datetime.now().year
-    existing = {
-        s.passport_number for s in
-        db.query(BusStop.passport_number)
-        .filter(BusStop.passport_number.like(f"TP-{year}-%"))
-        .all()
-    }
-    num = 1
-    while True:
-        candidate = f"TP-{year}-{str(num).zfill(4)}"
-        if candidate not in existing:
-            return candidate
-        num += 1
-
+# ============== ENDPOINTS ==============
 
-def generate_qr_code(passport_number: str) -> str:
-    """Генерирует QR-код для цифрового паспорта (ТЗ 2.2.3)"""
-    try:
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(f"passport:{passport_number}")
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        return f"data:image/png;base64,{b64}"
-    except Exception:
-        return ""
+# Колонки, по которым допустим keyset-режим: NOT NULL (или с default),
+# иначе сравнение кортежей теряет строки с NULL
+CURSOR_SORT_COLUMNS = {"id", "stop_id", "address", "district", "created_at", "updated_at"}
 
 
-# ============== ENDPOINTS ==============
-
 @router.get("", response_model=BusStopListResponse)
 async def get_stops(
     request: Request,
@@ -95,10 +76,21 @@ async def get_stops(
     meets_standards: Optional[bool] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
+    use_cursor: bool = False,
+    cursor: Optional[str] = None,
+    count: Optional[str] = Query(None, regex="^(exact|estimated|none)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
-    query = db.query(BusStop).options(joinedload(BusStop.photos))
+    """
+    Список остановок.
+
+    По умолчанию — постраничный режим (page/per_page) с точным total.
+    Keyset-режим включается через use_cursor=true или передачу cursor:
+    ответ содержит next_cursor, а total считается только при count=exact|estimated.
+    """
+    query = db.query(BusStop)
+    filtered = False
 
     if search:
         term = f"%{search}%"
@@ -111,20 +103,57 @@ async def get_stops(
                 BusStop.district.ilike(term),
             )
         )
+        filtered = True
     if district:
         query = query.filter(BusStop.district == district)
+        filtered = True
     if status:
         query = query.filter(BusStop.status == status)
+        filtered = True
     if condition:
         query = query.filter(BusStop.condition == condition)
+        filtered = True
     if has_electricity is not None:
         query = query.filter(BusStop.has_electricity == has_electricity)
+        filtered = True
     if has_bin is not None:
         query = query.filter(BusStop.has_bin == has_bin)
+        filtered = True
     if meets_standards is not None:
         query = query.filter(BusStop.meets_standards == meets_standards)
+        filtered = True
 
-    total = query.count()
+    if use_cursor or cursor:
+        if sort_by not in CURSOR_SORT_COLUMNS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Режим курсора поддерживает сортировку по: {', '.join(sorted(CURSOR_SORT_COLUMNS))}"
+            )
+        total, total_is_exact = count_rows(query, count or "none", "bus_stops", filtered)
+
+        sort_column = getattr(BusStop, sort_by)
+        after = decode_cursor(cursor, sort_by, sort_order) if cursor else None
+        page_query = apply_keyset(query, sort_column, BusStop.id, sort_order, after)
+        rows = page_query.options(
+            defer(BusStop.qr_code), joinedload(BusStop.photos)
+        ).limit(per_page + 1).all()
+
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
+
+        return {
+            "stops": rows,
+            "total": total,
+            "total_is_exact": total_is_exact,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page if total is not None else None,
+            "next_cursor": next_cursor,
+        }
+
+    total, total_is_exact = count_rows(query, count or "exact", "bus_stops", filtered)
 
     sort_column = getattr(BusStop, sort_by, BusStop.created_at)
     if sort_order == "desc":
@@ -133,81 +162,256 @@ async def get_stops(
         query = query.order_by(sort_column.asc())
 
     offset = (page - 1) * per_page
-    stops = query.offset(offset).limit(per_page).all()
-    pages = (total + per_page - 1) // per_page
+    stops = query.options(
+        defer(BusStop.qr_code), joinedload(BusStop.photos)
+    ).offset(offset).limit(per_page).all()
+    pages = (total + per_page - 1) // per_page if total is not None else None
 
-    return {"stops": stops, "total": total, "page": page, "per_page": per_page, "pages": pages}
+    return {
+        "stops": stops,
+        "total": total,
+        "total_is_exact": total_is_exact,
+        "page": page,
+        "per_page": per_page,
+        "pages": pages,
+    }
 
 
 @router.get("/all", response_model=List[BusStopResponse])
 async def get_all_stops(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     """
     FIX: Добавлен endpoint /stops/all — используется фронтендом для карты.
     Возвращает все остановки без пагинации.
+    Для маркеров карты использовать /stops/map — он в разы легче.
     """
     stops = db.query(BusStop).options(
+        defer(BusStop.qr_code),
         joinedload(BusStop.photos),
         joinedload(BusStop.custom_field_values).joinedload(CustomFieldValue.field),
     ).all()
     return [BusStopResponse.from_stop(s) for s in stops]
 
 
-@router.get("/stats", response_model=StatsResponse)
-async def get_stats(
+def _map_columns(rows) -> dict:
+    """Колоночное представление точек (формат /map)"""
+    return {
+        "count": len(rows),
+        "id": [r.id for r in rows],
+        "stop_id": [r.stop_id for r in rows],
+        "lat": [round(r.latitude, 6) for r in rows],
+        "lon": [round(r.longitude, 6) for r in rows],
+        "status": [r.status.value if r.status else None for r in rows],
+        "condition": [r.condition.value if r.condition else None for r in rows],
+        "district": [r.district for r in rows],
+        "address": [r.address for r in rows],
+        "landmark": [r.landmark for r in rows],
+    }
+
+
+# Сериализованный ответ /map для текущей версии данных — один на процесс,
+# чтобы повторные запросы разных клиентов не пересобирали JSON
+_map_payload_cache: dict = {"etag": None, "body": None}
+
+
+@router.get("/map")
+async def get_map_stops(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
-    total = db.query(BusStop).count()
-    active = db.query(BusStop).filter(BusStop.status == "active").count()
-    repair = db.query(BusStop).filter(BusStop.status == "repair").count()
-    dismantled = db.query(BusStop).filter(BusStop.status == "dismantled").count()
-    inactive = db.query(BusStop).filter(BusStop.status == "inactive").count()
+    """
+    Компактные данные для маркеров карты (замена /stops/all для MapView).
+
+    Колоночный JSON: {"count": N, "id": [...], "stop_id": [...], "lat": [...],
+    "lon": [...], "status": [...], "condition": [...], "district": [...],
+    "address": [...], "landmark": [...]} — i-й элемент каждого массива
+    относится к одной остановке. Адрес и ориентир нужны для поиска на карте;
+    остальное попап маркера догружает через /stops/{id}. ETag строится из max(updated_at) и
+    количества строк; при совпадении If-None-Match возвращается 304.
+    """
+    max_updated, total = db.query(func.max(BusStop.updated_at), func.count(BusStop.id)).one()
+    etag = make_etag("stops-map", max_updated, total)
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if _map_payload_cache["etag"] != etag:
+        rows = db.query(
+            BusStop.id, BusStop.stop_id, BusStop.latitude, BusStop.longitude,
+            BusStop.status, BusStop.condition,
+            BusStop.district, BusStop.address, BusStop.landmark,
+        ).order_by(BusStop.id).all()
+
+        payload = _map_columns(rows)
+        _map_payload_cache["body"] = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        _map_payload_cache["etag"] = etag
+
+    return Response(
+        content=_map_payload_cache["body"],
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
 
-    excellent = db.query(BusStop).filter(BusStop.condition == "excellent").count()
-    satisfactory = db.query(BusStop).filter(BusStop.condition == "satisfactory").count()
-    needs_repair = db.query(BusStop).filter(BusStop.condition == "needs_repair").count()
-    critical = db.query(BusStop).filter(BusStop.condition == "critical").count()
+def _viewport_query(db: Session, bbox: BBox, status: Optional[str], condition: Optional[str]):
+    """
+    Остановки внутри bbox с фильтрами.
+    Фильтр по диапазону latitude/longitude идёт по idx_bus_stops_location.
+    """
+    query = db.query(BusStop).filter(
+        BusStop.latitude.between(bbox.min_lat, bbox.max_lat),
+        BusStop.longitude.between(bbox.min_lon, bbox.max_lon),
+    )
+    if status:
+        query = query.filter(BusStop.status == status)
+    if condition:
+        query = query.filter(BusStop.condition == condition)
+    return query
+
+
+def _viewport_payload(query, bbox: BBox, zoom: Optional[int]) -> dict:
+    """Остановки запроса: точки на крупном зуме, кластеры по сетке на мелком"""
+    clustered = zoom is not None and zoom <= CLUSTER_MAX_ZOOM
+    if not clustered:
+        rows = query.with_entities(
+            BusStop.id, BusStop.stop_id, BusStop.latitude, BusStop.longitude,
+            BusStop.status, BusStop.condition,
+            BusStop.district, BusStop.address, BusStop.landmark,
+        ).order_by(BusStop.id).limit(MAX_POINTS_PER_VIEWPORT + 1).all()
+        if len(rows) <= MAX_POINTS_PER_VIEWPORT:
+            return {"type": "points", **_map_columns(rows)}
+
+    cell_lat = (bbox.max_lat - bbox.min_lat) / CLUSTER_GRID
+    cell_lon = (bbox.max_lon - bbox.min_lon) / CLUSTER_GRID
+    statuses = [s.value for s in StopStatus]
+
+    cells = query.with_entities(
+        func.floor((BusStop.latitude - bbox.min_lat) / cell_lat).label("cy"),
+        func.floor((BusStop.longitude - bbox.min_lon) / cell_lon).label("cx"),
+        func.count(BusStop.id).label("n"),
+        func.avg(BusStop.latitude).label("lat"),
+        func.avg(BusStop.longitude).label("lon"),
+        *[func.count(BusStop.id).filter(BusStop.status == st).label(f"s_{st}") for st in statuses],
+    ).group_by(text("cy"), text("cx")).all()
+
+    return {
+        "type": "clusters",
+        "count": sum(c.n for c in cells),
+        "clusters": [
+            {
+                "lat": round(float(c.lat), 6),
+                "lon": round(float(c.lon), 6),
+                "count": c.n,
+                "by_status": {st: getattr(c, f"s_{st}") for st in statuses if getattr(c, f"s_{st}")},
+            }
+            for c in cells
+        ],
+    }
+
+
+def _viewport_response(request: Request, db: Session, bbox: BBox, zoom: Optional[int],
+                       status: Optional[str], condition: Optional[str]) -> Response:
+    query = _viewport_query(db, bbox, status, condition)
+    # Версия только по остановкам области (тот же индекс, что и выборка):
+    # правка за пределами bbox не сбрасывает ETag этой области.
+    # Уход остановки из области меняет количество
+    max_updated, total = query.with_entities(func.max(BusStop.updated_at), func.count(BusStop.id)).one()
+    etag = make_etag("stops-viewport", max_updated, total, *bbox, zoom, status, condition)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    payload = _viewport_payload(query, bbox, zoom)
+    return Response(
+        content=json.dumps(payload, separators=(",", ":")),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+@router.get("/map/bbox")
+async def get_map_bbox(
+    request: Request,
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    status: Optional[str] = None,
+    condition: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    """
+    Остановки в видимой области карты.
+    При zoom <= CLUSTER_MAX_ZOOM (или слишком большом числе точек) —
+    серверные кластеры с количеством по статусам.
+    """
+    bbox = BBox(min_lat, min_lon, max_lat, max_lon)
+    if not bbox.is_valid:
+        raise HTTPException(status_code=400, detail="Некорректные границы области")
+    return _viewport_response(request, db, bbox, zoom, status, condition)
+
+
+@router.get("/map/tiles/{z}/{x}/{y}")
+async def get_map_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    status: Optional[str] = None,
+    condition: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    """Остановки в тайле z/x/y (XYZ, Web Mercator) — формат как у /map/bbox"""
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Некорректные координаты тайла")
+    return _viewport_response(request, db, tile_to_bbox(z, x, y), z, status, condition)
 
-    first_day = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    inspected = db.query(BusStop).filter(
-        BusStop.last_inspection_date >= first_day
-    ).count()
 
-    districts = db.query(BusStop.district, func.count(BusStop.id)).group_by(BusStop.district).all()
-    by_district = {d[0]: d[1] for d in districts}
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    stats = read_stats(db)
+    by_status, by_condition = stats["by_status"], stats["by_condition"]
 
     return {
-        "total_stops": total,
-        "active_stops": active,
-        "repair_stops": repair,
-        "dismantled_stops": dismantled,
-        "inactive_stops": inactive,
-        "excellent_condition": excellent,
-        "satisfactory_condition": satisfactory,
-        "needs_repair_condition": needs_repair,
-        "critical_condition": critical,
-        "inspected_this_month": inspected,
-        "by_district": by_district,
+        "total_stops": stats["total"],
+        "active_stops": by_status["active"],
+        "repair_stops": by_status["repair"],
+        "dismantled_stops": by_status["dismantled"],
+        "inactive_stops": by_status["inactive"],
+        "excellent_condition": by_condition["excellent"],
+        "satisfactory_condition": by_condition["satisfactory"],
+        "needs_repair_condition": by_condition["needs_repair"],
+        "critical_condition": by_condition["critical"],
+        "inspected_this_month": stats["inspected_this_month"],
+        "by_district": stats["by_district"],
+        "updated_at": stats["updated_at"],
     }
 
 
 @router.get("/districts")
 async def get_districts(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
-    districts = db.query(BusStop.district).distinct().all()
-    return {"districts": [d[0] for d in districts if d[0]]}
+    return cached_json_response(request, "stops:districts", lambda: {
+        "districts": [d[0] for d in db.query(BusStop.district).distinct().all() if d[0]]
+    })
 
 
 @router.get("/{stop_id}", response_model=BusStopResponse)
 async def get_stop(
     stop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     stop = db.query(BusStop).options(
         joinedload(BusStop.photos),
@@ -226,11 +430,49 @@ async def get_stop(
     return BusStopResponse.from_stop(stop)
 
 
+@router.get("/{stop_id}/qr")
+async def get_stop_qr(
+    stop_id: str,
+    request: Request,
+    format: str = Query("png", regex="^(png|svg)$"),
+    size: str = Query("m", regex="^(s|m|l)$"),
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_any_role)
+):
+    """
+    QR-код цифрового паспорта (ТЗ 2.2.3).
+    Рендерится при первом запросе вне event loop и кэшируется (core/qr.py).
+    """
+    stop = db.query(BusStop.passport_number).filter(
+        or_(
+            BusStop.stop_id == stop_id,
+            BusStop.id == int(stop_id) if stop_id.isdigit() else False
+        )
+    ).first()
+
+    if not stop:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Остановка не найдена")
+    if not stop.passport_number:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="У остановки нет номера паспорта")
+
+    etag = make_etag("qr", stop.passport_number, format, size)
+    cache_control = "private, max-age=86400"
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+
+    content = await run_in_threadpool(render_qr, stop.passport_number, format, size)
+    return Response(
+        content=content,
+        media_type=QR_MEDIA_TYPES[format],
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
 @router.get("/{stop_id}/history", response_model=List[ChangeLogResponse])
 async def get_stop_history(
     stop_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_any_role)
+    current_user: UserSnapshot = Depends(require_any_role)
 ):
     """
     FIX: Добавлен endpoint /{stop_id}/history — используется фронтендом.
@@ -258,23 +500,23 @@ async def create_stop(
     request: Request,
     stop_data: BusStopCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
-    stop_id = generate_stop_id(db)
-    passport_number = generate_passport_number(db)
-    qr = generate_qr_code(passport_number)
+    stop_id = next_stop_id(db)
+    passport_number = next_passport_number(db)
 
     stop = BusStop(
         stop_id=stop_id,
         passport_number=passport_number,
-        qr_code=qr,
         created_by=current_user.id,
         **stop_data.model_dump()
     )
 
     db.add(stop)
+    apply_stats_delta(db, None, stop_stats_keys(stop))
     db.commit()
     db.refresh(stop)
+    directory_cache.invalidate("stops:districts")
 
     AuditLogger.log_create(
         db=db,
@@ -288,13 +530,166 @@ async def create_stop(
     return stop
 
 
+# ============== IMPORT ==============
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def _iter_csv_rows(raw) -> Iterator[list]:
+    """Построчное чтение CSV (разделитель , ; или TAB определяется по началу файла)"""
+    text_stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        sample = text_stream.read(4096)
+        text_stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text_stream, dialect)
+    finally:
+        text_stream.detach()
+
+
+def _iter_xlsx_rows(raw) -> Iterator[list]:
+    """Построчное чтение первого листа XLSX в режиме read_only"""
+    try:
+        import openpyxl
+    except ImportError:
+        raise HTTPException(status_code=500, detail="Модуль openpyxl не установлен")
+
+    wb = openpyxl.load_workbook(raw, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def _insert_import_batch(db: Session, batch: List[dict], user: UserSnapshot) -> None:
+    """Пачка строк → один INSERT (executemany) с заранее зарезервированными номерами"""
+    stop_ids = reserve_stop_ids(db, len(batch))
+    passports = reserve_passport_numbers(db, len(batch))
+    for row, stop_id, passport in zip(batch, stop_ids, passports):
+        row["stop_id"] = stop_id
+        row["passport_number"] = passport
+        row["created_by"] = user.id
+    db.execute(insert(BusStop), batch)
+    apply_stats_bulk(db, [
+        {
+            "status": row["status"].value,
+            "condition": row["condition"].value,
+            "district": row["district"],
+            "inspected": None,
+        }
+        for row in batch
+    ])
+
+
+def _import_rows(db: Session, rows: Iterator[list], user: UserSnapshot, dry_run: bool) -> dict:
+    """
+    Валидация строк через BusStopCreate и вставка пачками по IMPORT_BATCH_SIZE.
+    Вся загрузка — одна транзакция: при ошибке БД ничего не сохраняется.
+    """
+    header = next(rows, None)
+    if not header:
+        raise HTTPException(status_code=400, detail="Файл пуст")
+    fields = map_import_header(header)
+    if not any(fields):
+        raise HTTPException(status_code=400, detail="Не найдено ни одной известной колонки")
+
+    imported = 0
+    total_rows = 0
+    row_errors = []
+    batch = []
+
+    for line_no, values in enumerate(rows, start=2):
+        if not any(v not in (None, "") for v in values):
+            continue
+        total_rows += 1
+        try:
+            data = BusStopCreate(**parse_import_row(fields, values)).model_dump()
+        except ValidationError as e:
+            row_errors.append({
+                "row": line_no,
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()],
+            })
+            continue
+
+        batch.append(data)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            if not dry_run:
+                _insert_import_batch(db, batch, user)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        if not dry_run:
+            _insert_import_batch(db, batch, user)
+        imported += len(batch)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    return {
+        "imported": imported,
+        "total_rows": total_rows,
+        "dry_run": dry_run,
+        "errors": [f"Строка {e['row']}: {'; '.join(e['errors'])}" for e in row_errors],
+        "row_errors": row_errors,
+    }
+
+
+@router.post("/import")
+async def import_stops(
+    request: Request,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
+):
+    """
+    Массовый импорт остановок из CSV/XLSX (колонки как в экспорте /reports/export
+    или имена полей BusStopCreate). Номера BS-xxx и паспорта выдаются системой.
+    Строки с ошибками пропускаются и перечисляются в отчёте.
+    dry_run=true — только проверка, без записи.
+    """
+    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in (file.filename or "") else ""
+    if ext == "csv":
+        rows = _iter_csv_rows(file.file)
+    elif ext == "xlsx":
+        rows = _iter_xlsx_rows(file.file)
+    else:
+        raise HTTPException(status_code=400, detail="Поддерживаются только файлы CSV и XLSX")
+
+    try:
+        result = await run_in_threadpool(_import_rows, db, rows, current_user, dry_run)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="CSV должен быть в кодировке UTF-8")
+
+    if result["imported"] and not dry_run:
+        directory_cache.invalidate("stops:districts")
+        AuditLogger.log_create(
+            db=db,
+            user=current_user,
+            resource_type="stop_import",
+            resource_id=file.filename,
+            data={"imported": result["imported"], "errors": len(result["row_errors"])},
+            ip_address=get_client_ip(request)
+        )
+
+    return result
+
+
 @router.put("/{stop_id}", response_model=BusStopResponse)
 async def update_stop(
     stop_id: str,
     request: Request,
     stop_data: BusStopUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     stop = db.query(BusStop).filter(
         or_(
@@ -306,34 +701,31 @@ async def update_stop(
     if not stop:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Остановка не найдена")
 
-    old_data = {c.name: getattr(stop, c.name) for c in BusStop.__table__.columns}
+    old_stats_keys = stop_stats_keys(stop)
 
-    update_dict = stop_data.model_dump(exclude_unset=True)
-    for field, value in update_dict.items():
+    for field, value in stop_data.model_dump(exclude_unset=True).items():
         if hasattr(stop, field):
-            old_value = getattr(stop, field)
-            if old_value != value:
-                setattr(stop, field, value)
-                change_log = ChangeLog(
-                    bus_stop_id=stop.id,
-                    user_id=current_user.id,
-                    user_name=current_user.name,
-                    field_name=field,
-                    old_value=(old_value.value if hasattr(old_value, 'value') else str(old_value)) if old_value is not None else None,
-                    new_value=(value.value if hasattr(value, 'value') else str(value)) if value is not None else None,
-                    ip_address=get_client_ip(request)
-                )
-                db.add(change_log)
-
-    db.commit()
-    db.refresh(stop)
-
-    new_data = {c.name: getattr(stop, c.name) for c in BusStop.__table__.columns}
-    AuditLogger.log_update(
-        db=db, user=current_user, resource_type="stop",
-        resource_id=stop.stop_id, old_data=old_data, new_data=new_data,
-        ip_address=get_client_ip(request)
-    )
+            setattr(stop, field, value)
+
+    # Дифф считается один раз по истории атрибутов; журнал изменений
+    # и счётчики уходят одной транзакцией (аудит — через буфер AuditSink)
+    changes = collect_changes(stop)
+    if changes:
+        client_ip = get_client_ip(request)
+        write_change_logs(db, stop.id, current_user, changes, client_ip)
+        apply_stats_delta(db, old_stats_keys, stop_stats_keys(stop))
+        AuditLogger.log_update(
+            db=db, user=current_user, resource_type="stop",
+            resource_id=stop.stop_id,
+            old_data={field: old for field, (old, _) in changes.items()},
+            new_data={field: new for field, (_, new) in changes.items()},
+            ip_address=client_ip,
+            commit=False,
+        )
+        db.commit()
+        db.refresh(stop)
+        if "district" in changes:
+            directory_cache.invalidate("stops:districts")
 
     return stop
 
@@ -343,7 +735,7 @@ async def delete_stop(
     stop_id: str,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     if current_user.role.value != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Только администратор может удалять остановки")
@@ -359,8 +751,15 @@ async def delete_stop(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Остановка не найдена")
 
     stop_data_log = {"stop_id": stop.stop_id, "address": stop.address}
+    apply_stats_delta(db, stop_stats_keys(stop), None)
+    release_ids(db, stop.stop_id, stop.passport_number)
+    photos = list(stop.photos)
     db.delete(stop)
+    db.flush()
+    for photo in photos:
+        release_photo_files(db, photo)
     db.commit()
+    directory_cache.invalidate("stops:districts")
 
     AuditLogger.log_delete(
         db=db, user=current_user, resource_type="stop",
@@ -376,7 +775,7 @@ async def update_custom_field_values(
     request: Request,
     values: List[dict],
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector),
+    current_user: UserSnapshot = Depends(require_admin_or_inspector),
 ):
     """Сохраняет значения пользовательских характеристик для остановки.
     values: [{"field_id": 1, "value": "..."}, ...]
@@ -412,7 +811,7 @@ async def record_inspection(
     request: Request,
     next_inspection_date: Optional[datetime] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin_or_inspector)
+    current_user: UserSnapshot = Depends(require_admin_or_inspector)
 ):
     stop = db.query(BusStop).filter(
         or_(
@@ -424,11 +823,13 @@ async def record_inspection(
     if not stop:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Остановка не найдена")
 
+    old_stats_keys = stop_stats_keys(stop)
     stop.last_inspection_date = datetime.utcnow()
     stop.inspector_name = current_user.name
     if next_inspection_date:
         stop.next_inspection_date = next_inspection_date
 
+    apply_stats_delta(db, old_stats_keys, stop_stats_keys(stop))
     db.commit()
     db.refresh(stop)
 
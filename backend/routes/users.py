@@ -11,7 +11,9 @@ from models import User
 from schemas import (
     UserCreate, UserUpdate, UserResponse, UserListResponse
 )
-from core.security import get_password_hash, validate_password_strength
+from core.security import validate_password_strength
+from core.hashing import password_hasher
+from core.user_cache import UserSnapshot, user_cache
 from core.dependencies import get_current_user, require_admin
 from middleware.audit import AuditLogger
 
@@ -35,7 +37,7 @@ async def get_users(
     role: Optional[str] = None,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Получение списка пользователей (только для админа)
@@ -68,7 +70,7 @@ async def get_users(
 async def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Получение пользователя по ID
@@ -89,7 +91,7 @@ async def create_user(
     request: Request,
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Создание нового пользователя (только для админа)
@@ -111,7 +113,7 @@ async def create_user(
     user = User(
         email=user_data.email,
         name=user_data.name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await password_hasher.hash(user_data.password),
         role=user_data.role,
         created_by=current_user.id
     )
@@ -139,7 +141,7 @@ async def update_user(
     request: Request,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Обновление пользователя (только для админа)
@@ -195,10 +197,12 @@ async def update_user(
         user.is_active = user_data.is_active
     
     if user_data.password:
-        user.password_hash = get_password_hash(user_data.password)
+        user.password_hash = await password_hasher.hash(user_data.password)
     
     db.commit()
     db.refresh(user)
+    # Роль, имя и активность в get_current_user — из кэша
+    user_cache.invalidate(user.id)
     
     # Логируем
     new_data = {
@@ -226,7 +230,7 @@ async def delete_user(
     user_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Удаление пользователя (только для админа)
@@ -255,6 +259,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     
     # Логируем
     AuditLogger.log_delete(
@@ -274,7 +279,7 @@ async def unlock_user(
     user_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Разблокировка пользователя (сброс блокировки)
@@ -309,7 +314,7 @@ async def reset_password(
     request: Request,
     new_password: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: UserSnapshot = Depends(require_admin)
 ):
     """
     Сброс пароля пользователя (только для админа)
@@ -328,7 +333,7 @@ async def reset_password(
             detail="Пароль должен содержать минимум 6 символов"
         )
     
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await password_hasher.hash(new_password)
     user.failed_login_attempts = 0
     user.locked_until = None
     db.commit()
@@ -7,6 +7,7 @@
 DROP TABLE IF EXISTS audit_logs CASCADE;
 DROP TABLE IF EXISTS change_logs CASCADE;
 DROP TABLE IF EXISTS photos CASCADE;
+DROP TABLE IF EXISTS photo_blobs CASCADE;
 DROP TABLE IF EXISTS bus_stops CASCADE;
 DROP TABLE IF EXISTS refresh_tokens CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
@@ -156,6 +157,16 @@ CREATE INDEX idx_bus_stops_status_condition ON bus_stops(status, condition);
 -- Таблица фотографий
 -- ============================================================
 
+-- Уникальное содержимое фото (uploads/blobs/ab/cd/<sha256>.<ext>)
+CREATE TABLE photo_blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    file_path VARCHAR(500) NOT NULL,
+    file_size INTEGER,
+    mime_type VARCHAR(50),
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE photos (
     id SERIAL PRIMARY KEY,
     bus_stop_id INTEGER NOT NULL REFERENCES bus_stops(id) ON DELETE CASCADE,
@@ -167,6 +178,7 @@ CREATE TABLE photos (
     mime_type VARCHAR(50),
     
     is_main BOOLEAN DEFAULT FALSE,
+    blob_sha256 VARCHAR(64) REFERENCES photo_blobs(sha256),
     
     -- Метаданные
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -176,14 +188,17 @@ CREATE TABLE photos (
 
 CREATE INDEX idx_photos_bus_stop_id ON photos(bus_stop_id);
 CREATE INDEX idx_photos_is_main ON photos(is_main);
+CREATE INDEX ix_photos_blob_sha256 ON photos(blob_sha256);
 
 
 -- ============================================================
 -- Журнал изменений остановок
 -- ============================================================
 
+-- Секционирована по месяцам changed_at; секции создаёт приложение
+-- при старте и manage_partitions.py (core/partitions.py)
 CREATE TABLE change_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     bus_stop_id INTEGER NOT NULL REFERENCES bus_stops(id) ON DELETE CASCADE,
     
     user_id INTEGER REFERENCES users(id),
@@ -193,9 +208,13 @@ CREATE TABLE change_logs (
     old_value TEXT,
     new_value TEXT,
     
-    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    ip_address VARCHAR(45)
-);
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ip_address VARCHAR(45),
+    
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+
+CREATE TABLE change_logs_default PARTITION OF change_logs DEFAULT;
 
 CREATE INDEX idx_change_logs_bus_stop_id ON change_logs(bus_stop_id);
 CREATE INDEX idx_change_logs_stop_date ON change_logs(bus_stop_id, changed_at);
@@ -205,8 +224,10 @@ CREATE INDEX idx_change_logs_stop_date ON change_logs(bus_stop_id, changed_at);
 -- Журнал аудита (все действия в системе)
 -- ============================================================
 
+-- Секционирована по месяцам timestamp, старые секции архивируются
+-- по AUDIT_RETENTION_MONTHS (manage_partitions.py archive)
 CREATE TABLE audit_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     
     user_id INTEGER REFERENCES users(id),
     user_email VARCHAR(255),
@@ -220,8 +241,12 @@ CREATE TABLE audit_logs (
     ip_address VARCHAR(45),
     user_agent VARCHAR(500),
     
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
 
 CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id);
 CREATE INDEX idx_audit_logs_timestamp ON audit_logs(timestamp);
@@ -2,11 +2,13 @@
 Pydantic схемы для валидации данных
 """
 
-from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, computed_field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
+from core.images import PHOTO_VARIANTS
+
 
 # ============== ENUMS ==============
 
@@ -218,6 +220,39 @@ class PhotoResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def variants(self) -> Dict[str, str]:
+        """URL уменьшенных копий: thumb, medium, thumb_webp, medium_webp"""
+        return {name: f"/api/photos/{self.id}/variants/{name}" for name in PHOTO_VARIANTS}
+
+
+class ResumableUploadInit(BaseModel):
+    filename: str
+    content_type: str
+    total_size: int
+    is_main: bool = False
+    # SHA-256 всего файла (hex) — проверяется при завершении, если передан
+    sha256: Optional[str] = None
+
+    @field_validator("total_size")
+    @classmethod
+    def validate_total_size(cls, v: int) -> int:
+        if v <= 0:
+            raise ValueError("Размер файла должен быть больше нуля")
+        return v
+
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    # Подтверждённое смещение: следующий кусок отправляется с offset=received_bytes
+    received_bytes: int
+    chunks_received: int
+    complete: bool
+
 
 class ChangeLogResponse(BaseModel):
     id: int
@@ -239,10 +274,10 @@ class CustomFieldValueResponse(BaseModel):
 
 
 class BusStopResponse(BaseModel):
+    # QR-код не входит в ответ — изображение отдаёт GET /api/stops/{stop_id}/qr
     id: int
     stop_id: str
     passport_number: Optional[str] = None
-    qr_code: Optional[str] = None
 
     address: str
     landmark: Optional[str] = None
@@ -295,7 +330,7 @@ class BusStopResponse(BaseModel):
     @classmethod
     def from_stop(cls, stop):
         """Build response with custom field values properly mapped"""
-        data = {c.name: getattr(stop, c.name) for c in stop.__table__.columns}
+        data = {c.name: getattr(stop, c.name) for c in stop.__table__.columns if c.name != "qr_code"}
         data["photos"] = stop.photos
         data["change_logs"] = stop.change_logs
         data["custom_field_values"] = [
@@ -314,10 +349,13 @@ class BusStopResponse(BaseModel):
 class BusStopListResponse(BaseModel):
     # FIX: frontend ожидал 'items', теперь 'stops' и в frontend исправлено тоже
     stops: List[BusStopResponse]
-    total: int
-    page: int
+    # В режиме курсора total/pages считаются только по запросу (count=exact|estimated)
+    total: Optional[int] = None
+    total_is_exact: bool = True
+    page: Optional[int] = None
     per_page: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class StatsResponse(BaseModel):
@@ -334,6 +372,39 @@ class StatsResponse(BaseModel):
 
     inspected_this_month: int
     by_district: dict
+    # Время последнего обновления снапшота счётчиков
+    updated_at: Optional[datetime] = None
+
+
+class ExportJobCreate(BaseModel):
+    format: str = "xlsx"
+    district: Optional[str] = None
+    status: Optional[str] = None
+    condition: Optional[str] = None
+
+    @field_validator("format")
+    @classmethod
+    def validate_format(cls, v: str) -> str:
+        if v not in ("xlsx", "csv"):
+            raise ValueError("Формат должен быть xlsx или csv")
+        return v
+
+
+class ExportJobResponse(BaseModel):
+    id: str
+    format: str
+    filters: dict
+    status: str
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    # Доля выполнения 0..1 (None, пока total_rows неизвестен)
+    progress: Optional[float] = None
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    # Ответ отдан из кэша готовых файлов (те же фильтры и данные)
+    cached: bool = False
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class ReportFilter(BaseModel):
@@ -0,0 +1,46 @@
+"""RateLimitMiddleware: лимиты по типам запросов"""
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from middleware.rate_limit import RateLimitMiddleware
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+def make_client(**limits) -> TestClient:
+    app = Starlette(routes=[Route("/{path:path}", ok, methods=["GET", "HEAD", "PUT", "POST"])])
+    options = {"upload_limit": 10, "upload_window": 60, **limits}
+    return TestClient(RateLimitMiddleware(app, **options))
+
+
+def test_photo_thumbnails_page_is_not_limited():
+    client = make_client()
+    statuses = [
+        client.get(f"/api/photos/{photo_id}/variants/thumb_webp").status_code
+        for photo_id in range(1, 41)
+    ]
+    assert statuses == [200] * 40
+
+
+def test_photo_upload_is_still_limited():
+    client = make_client()
+    statuses = [client.post("/api/photos/upload/1").status_code for _ in range(12)]
+    assert statuses == [200] * 10 + [429] * 2
+
+
+def test_resumable_chunks_and_status_use_session_limit():
+    client = make_client()
+    upload_id = "0123456789abcdef0123456789abcdef"
+    statuses = [client.put(f"/api/photos/resumable/{upload_id}?offset={n}").status_code for n in range(12)]
+    statuses += [client.get(f"/api/photos/resumable/{upload_id}").status_code for _ in range(5)]
+    assert statuses == [200] * 17
+
+
+def test_resumable_session_creation_uses_upload_limit():
+    client = make_client()
+    statuses = [client.post("/api/photos/upload/1/resumable").status_code for _ in range(12)]
+    assert statuses == [200] * 10 + [429] * 2
@@ -0,0 +1,32 @@
+"""
+Подбор стоимости bcrypt под железо сервера (core/security.py).
+
+Запуск:
+    python tune_password_hash.py [--target-ms 250]
+
+Выводит время хеширования для каждого числа раундов и рекомендуемое
+значение BCRYPT_ROUNDS для .env. Запускать на том же сервере, где
+работает API. После смены значения хеши пользователей пересчитываются
+при их следующем входе.
+"""
+import argparse
+
+from core.config import settings
+from core.security import benchmark_bcrypt_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор BCRYPT_ROUNDS")
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS)
+    args = parser.parse_args()
+
+    rounds, timings = benchmark_bcrypt_rounds(args.target_ms)
+    for r, ms in timings:
+        mark = " <-" if r == rounds else ""
+        print(f"  rounds={r:<3} {ms:>8.1f} мс{mark}")
+    print(f"Текущее значение: BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}")
+    print(f"Рекомендуется (цель {args.target_ms:.0f} мс): BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
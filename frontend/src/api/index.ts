@@ -34,6 +34,7 @@ export {
 export {
   getStops,
   getAllStops,
+  getMapStops,
   getStop,
   createStop,
   updateStop,
@@ -41,6 +42,7 @@ export {
   getStopStats,
   getStopHistory,
   uploadStopPhoto,
+  uploadStopPhotoResumable,
   deleteStopPhoto,
   setMainPhoto,
   importStops,
@@ -64,10 +66,12 @@ export {
   downloadFile,
   downloadExcelReport,
   downloadPdfReport,
+  createExportJob,
+  getExportJob,
 } from './reports';
 
 // Types
 export type { LoginRequest, LoginResponse, User } from './auth';
 export type { StopsFilter, StopsResponse, StopStats } from './stops';
 export type { CreateUserRequest, UpdateUserRequest } from './users';
-export type { DashboardStats, ReportFilter } from './reports';
+export type { DashboardStats, ReportFilter, ExportJob } from './reports';
@@ -2,7 +2,7 @@
  * Reports API
  * Отчёты и аналитика
  */
-import { api, apiGet } from './client';
+import { api, apiGet, apiPost } from './client';
 
 export interface DashboardStats {
   total_stops: number;
@@ -41,6 +41,21 @@ export interface ReportFilter {
   date_to?: string;
 }
 
+export interface ExportJob {
+  id: string;
+  format: 'xlsx' | 'csv';
+  filters: Record<string, string | null>;
+  status: 'pending' | 'running' | 'done' | 'failed';
+  total_rows: number | null;
+  processed_rows: number;
+  progress: number | null;
+  download_url: string | null;
+  error: string | null;
+  cached: boolean;
+  created_at: string | null;
+  finished_at: string | null;
+}
+
 /**
  * Получение данных для дашборда
  */
@@ -70,6 +85,23 @@ export async function exportToPdf(filters?: ReportFilter): Promise<Blob> {
   return response.data;
 }
 
+/**
+ * Фоновый экспорт: создание задачи (готовый файл — по download_url)
+ */
+export async function createExportJob(
+  format: 'xlsx' | 'csv',
+  filters?: Pick<ReportFilter, 'district' | 'status' | 'condition'>
+): Promise<ExportJob> {
+  return apiPost<ExportJob>('/reports/export/jobs', { format, ...filters });
+}
+
+/**
+ * Статус и прогресс задачи экспорта
+ */
+export async function getExportJob(jobId: string): Promise<ExportJob> {
+  return apiGet<ExportJob>(`/reports/export/jobs/${jobId}`);
+}
+
 /**
  * Скачивание файла
  */
@@ -2,7 +2,7 @@
  * Stops API
  * FIX: синхронизировано с backend endpoints
  */
-import { apiGet, apiPost, apiPut, apiDelete, apiUpload } from './client';
+import { api, apiGet, apiPost, apiPut, apiDelete, apiUpload } from './client';
 import type { BusStop, ChangeLogEntry } from '../types';
 
 export interface StopsFilter {
@@ -14,14 +14,19 @@ export interface StopsFilter {
   per_page?: number;   // FIX: было limit → per_page
   sort_by?: string;
   sort_order?: string;
+  use_cursor?: boolean;  // keyset-режим: следующая страница по next_cursor
+  cursor?: string;
+  count?: 'exact' | 'estimated' | 'none';
 }
 
 export interface StopsResponse {
   stops: BusStop[];  // FIX: было items — backend возвращает 'stops'
-  total: number;
-  page: number;
+  total: number | null;   // null в режиме курсора без count
+  total_is_exact: boolean;
+  page: number | null;
   per_page: number;  // FIX: было limit
-  pages: number;
+  pages: number | null;
+  next_cursor?: string | null;
 }
 
 export interface StopStats {
@@ -36,6 +41,7 @@ export interface StopStats {
   critical_condition: number;
   inspected_this_month: number;
   by_district: Record<string, number>;
+  updated_at?: string | null;  // время обновления снапшота счётчиков
 }
 
 export interface PhotoResponse {
@@ -45,6 +51,7 @@ export interface PhotoResponse {
   is_main: boolean;
   uploaded_at: string;
   uploader_name?: string;
+  variants?: Partial<Record<'thumb' | 'medium' | 'thumb_webp' | 'medium_webp', string>>;
 }
 
 export interface MultipleUploadResult {
@@ -69,6 +76,54 @@ export async function getAllStops(): Promise<BusStop[]> {
   return apiGet<BusStop[]>('/stops/all');
 }
 
+export interface MapStop {
+  id: number;
+  stop_id: string;
+  latitude: number;
+  longitude: number;
+  status: string;
+  condition: string;
+  district: string;
+  address: string;
+  landmark?: string;
+}
+
+interface MapStopsColumns {
+  count: number;
+  id: number[];
+  stop_id: string[];
+  lat: number[];
+  lon: number[];
+  status: string[];
+  condition: string[];
+  district: string[];
+  address: string[];
+  landmark: (string | null)[];
+}
+
+/**
+ * Компактные данные для маркеров карты.
+ * Backend отдаёт колонки + ETag — повторная загрузка браузером идёт через 304.
+ */
+export async function getMapStops(): Promise<MapStop[]> {
+  const cols = await apiGet<MapStopsColumns>('/stops/map');
+  const result: MapStop[] = new Array(cols.count);
+  for (let i = 0; i < cols.count; i++) {
+    result[i] = {
+      id: cols.id[i],
+      stop_id: cols.stop_id[i],
+      latitude: cols.lat[i],
+      longitude: cols.lon[i],
+      status: cols.status[i],
+      condition: cols.condition[i],
+      district: cols.district[i],
+      address: cols.address[i],
+      landmark: cols.landmark[i] ?? undefined,
+    };
+  }
+  return result;
+}
+
 /**
  * Получение одной остановки по stop_id или числовому id
  */
@@ -108,6 +163,21 @@ export async function getStopStats(): Promise<StopStats> {
   return apiGet<StopStats>('/stops/stats');
 }
 
+/**
+ * QR-код цифрового паспорта (ТЗ 2.2.3) — рендерится backend'ом по запросу
+ */
+export async function getStopQrCode(
+  id: string,
+  format: 'png' | 'svg' = 'png',
+  size: 's' | 'm' | 'l' = 'm'
+): Promise<Blob> {
+  const response = await api.get(`/stops/${id}/qr`, {
+    params: { format, size },
+    responseType: 'blob',
+  });
+  return response.data;
+}
+
 /**
  * FIX: История изменений — backend endpoint /{stop_id}/history добавлен
  */
@@ -140,6 +210,60 @@ export async function uploadStopPhoto(
   return apiUpload<PhotoResponse>(`/photos/upload/${stopId}`, formData, onProgress);
 }
 
+export interface ResumableUploadStatus {
+  upload_id: string;
+  filename: string;
+  total_size: number;
+  chunk_size: number;
+  received_bytes: number;
+  chunks_received: number;
+  complete: boolean;
+}
+
+async function sha256Hex(data: ArrayBuffer): Promise<string> {
+  const hash = await crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(hash)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Возобновляемая загрузка фото кусками (нестабильная мобильная сеть).
+ * Передайте uploadId прерванной загрузки, чтобы продолжить с подтверждённого смещения.
+ */
+export async function uploadStopPhotoResumable(
+  stopId: string,
+  file: File,
+  options: {
+    isMain?: boolean;
+    uploadId?: string;
+    onProgress?: (percent: number) => void;
+    onStarted?: (uploadId: string) => void;
+  } = {}
+): Promise<PhotoResponse> {
+  let status = options.uploadId
+    ? await apiGet<ResumableUploadStatus>(`/photos/resumable/${options.uploadId}`)
+    : await apiPost<ResumableUploadStatus>(`/photos/upload/${stopId}/resumable`, {
+        filename: file.name,
+        content_type: file.type,
+        total_size: file.size,
+        is_main: options.isMain ?? false,
+        sha256: await sha256Hex(await file.arrayBuffer()),
+      });
+  options.onStarted?.(status.upload_id);
+
+  while (status.received_bytes < status.total_size) {
+    const offset = status.received_bytes;
+    const chunk = await file.slice(offset, offset + status.chunk_size).arrayBuffer();
+    const res = await api.put<ResumableUploadStatus>(`/photos/resumable/${status.upload_id}`, chunk, {
+      params: { offset },
+      headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': await sha256Hex(chunk) },
+    });
+    status = res.data;
+    options.onProgress?.(Math.round((status.received_bytes * 100) / status.total_size));
+  }
+
+  return apiPost<PhotoResponse>(`/photos/resumable/${status.upload_id}/complete`);
+}
+
 /**
  * Массовая загрузка фото для остановки (ТЗ 2.2.2)
  * Использует backend endpoint POST /photos/upload/{stop_id}/multiple
@@ -3,6 +3,7 @@ import { useStore } from '../store/useStore';
 import { STATUS_LABELS, CONDITION_LABELS, STATUS_COLORS, CONDITION_COLORS, DISTRICTS, StopStatus, ConditionLevel, BusStop } from '../types';
 import { Calendar, Zap, ZapOff, ChevronRight, Filter, X, Search, Building, Layers, Activity, Bus, MapPin, Camera, Trash2 } from 'lucide-react';
 import { cn } from '../utils/cn';
+import { photoUrl } from '../utils/photo';
 import { CustomSelect, SelectOption } from './CustomSelect';
 import { DeleteConfirmModal } from './DeleteConfirmModal';
 
@@ -182,7 +183,7 @@ export function ListView() {
         <div className="flex-1 overflow-y-auto px-4 md:px-6 py-4 space-y-4 pb-[60px]">
           {stops.map(stop => {
             const mainPhoto = (stop.photos || []).find(p => p.is_main) || (stop.photos || [])[0];
-            const photoUrl = mainPhoto ? `/${mainPhoto.file_path.replace(/\\/g, '/')}` : null;
+            const mainPhotoUrl = mainPhoto ? photoUrl(mainPhoto, 'thumb_webp') : null;
             return (
               <div
                 key={stop.id}
@@ -198,9 +199,9 @@ export function ListView() {
                   'w-28 md:w-36 flex-shrink-0 relative overflow-hidden',
                   dm ? 'bg-gray-700/60' : 'bg-gradient-to-br from-gray-100 to-gray-200'
                 )} style={{ minHeight: '120px' }}>
-                  {photoUrl ? (
+                  {mainPhotoUrl ? (
                     <img
-                      src={photoUrl}
+                      src={mainPhotoUrl}
                       alt={stop.stop_id}
                       className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500"
                       onError={(e) => {
@@ -212,7 +213,7 @@ export function ListView() {
                   ) : null}
                   <div className={cn(
                     'absolute inset-0 flex flex-col items-center justify-center gap-1',
-                    photoUrl ? 'hidden' : 'flex'
+                    mainPhotoUrl ? 'hidden' : 'flex'
                   )}>
                     <Camera className={cn('w-8 h-8', dm ? 'text-gray-500' : 'text-gray-300')} />
                     <span className={cn('text-xs font-medium', dm ? 'text-gray-600' : 'text-gray-400')}>Нет фото</span>
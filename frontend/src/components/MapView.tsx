@@ -1,8 +1,10 @@
 import { useState, useMemo, useEffect, useRef } from 'react';
 import { Search, Filter, MapPin, Bus, X, ChevronRight, Building, Layers, Activity } from 'lucide-react';
 import { useStore } from '../store/useStore';
-import { STATUS_LABELS, CONDITION_LABELS, DISTRICTS, StopStatus, ConditionLevel } from '../types';
+import { STATUS_LABELS, CONDITION_LABELS, DISTRICTS, StopStatus, ConditionLevel, BusStop } from '../types';
 import { CustomSelect } from './CustomSelect';
+import { photoUrl } from '../utils/photo';
+import { getStop, type MapStop } from '../api/stops';
 
 declare global {
   interface Window {
@@ -48,8 +50,44 @@ function createIcon(color: string) {
   });
 }
 
+// Попап маркера: данные /stops/map сразу, фото и маршруты — после загрузки карточки
+function buildPopupHtml(stop: MapStop, details?: BusStop) {
+  const color = STATUS_COLORS_MAP[stop.status] || '#3b82f6';
+  const condColor = CONDITION_COLORS_MAP[stop.condition] || '#3b82f6';
+  const photos = details?.photos || [];
+  const mainPhoto = photos.find(p => p.is_main) || photos[0];
+  const photoHtml = !details
+    ? `<div style="width:100%;height:140px;background:linear-gradient(135deg,#f1f5f9,#e2e8f0);border-radius:10px 10px 0 0;display:flex;align-items:center;justify-content:center;"><span style='font-size:11px;color:#94a3b8;font-weight:500;'>Загрузка…</span></div>`
+    : mainPhoto
+    ? `<img src="${photoUrl(mainPhoto, 'thumb_webp')}" style="width:100%;height:140px;object-fit:cover;border-radius:10px 10px 0 0;display:block;" onerror="this.style.display='none';this.nextElementSibling.style.display='flex'" /><div style="display:none;width:100%;height:140px;background:#f1f5f9;border-radius:10px 10px 0 0;align-items:center;justify-content:center;flex-direction:column;gap:6px;"><svg xmlns='http://www.w3.org/2000/svg' width='40' height='40' viewBox='0 0 24 24' fill='none' stroke='#94a3b8' stroke-width='1.5'><rect x='3' y='3' width='18' height='18' rx='2'/><circle cx='8.5' cy='8.5' r='1.5'/><polyline points='21 15 16 10 5 21'/></svg><span style='font-size:11px;color:#94a3b8;'>Фото недоступно</span></div>`
+    : `<div style="width:100%;height:140px;background:linear-gradient(135deg,#f1f5f9,#e2e8f0);border-radius:10px 10px 0 0;display:flex;align-items:center;justify-content:center;flex-direction:column;gap:8px;"><svg xmlns='http://www.w3.org/2000/svg' width='44' height='44' viewBox='0 0 24 24' fill='none' stroke='#94a3b8' stroke-width='1.5'><path d='M23 19a2 2 0 0 1-2 2H3a2 2 0 0 1-2-2V8a2 2 0 0 1 2-2h4l2-3h6l2 3h4a2 2 0 0 1 2 2z'/><circle cx='12' cy='13' r='4'/></svg><span style='font-size:11px;color:#94a3b8;font-weight:500;'>Нет фотографий</span></div>`;
+  return `
+    <div style="min-width:240px;font-family:system-ui,sans-serif;border-radius:10px;overflow:hidden;">
+      ${photoHtml}
+      <div style="padding:12px;">
+        <div style="display:flex;align-items:center;gap:8px;margin-bottom:8px;">
+          <span style="font-weight:800;font-size:16px;color:#1e293b;">${stop.stop_id}</span>
+          <span style="padding:2px 8px;border-radius:99px;font-size:11px;font-weight:600;background:${color}22;color:${color};border:1px solid ${color}44;">
+            ${STATUS_LABELS[stop.status as StopStatus]}
+          </span>
+        </div>
+        <div style="font-size:13px;color:#475569;margin-bottom:4px;">📍 ${stop.address}</div>
+        <div style="font-size:12px;color:#64748b;margin-bottom:4px;">🏘 ${stop.district}</div>
+        <div style="font-size:12px;color:#64748b;margin-bottom:8px;">🚌 ${details ? (details.routes || '—') : '…'}</div>
+        <div style="display:flex;align-items:center;gap:6px;margin-bottom:10px;">
+          <div style="width:8px;height:8px;border-radius:50%;background:${condColor};"></div>
+          <span style="font-size:12px;color:#64748b;">${CONDITION_LABELS[stop.condition as ConditionLevel]}</span>
+        </div>
+        <button onclick="window.openStopCard('${stop.id}')"
+          style="width:100%;padding:9px;background:linear-gradient(135deg,#3b82f6,#6366f1);color:white;border:none;border-radius:8px;cursor:pointer;font-weight:600;font-size:13px;transition:opacity 0.2s;"
+          onmouseover="this.style.opacity='0.85'" onmouseout="this.style.opacity='1'"
+        >Открыть карточку →</button>
+      </div>
+    </div>`;
+}
+
 export function MapView() {
-  const { stops, selectStop, darkMode } = useStore();
+  const { mapStops: stops, loadMapStops, selectStop, darkMode } = useStore();
   const storeDistricts = useStore(s => s.districts);
   const [search, setSearch] = useState('');
   const [districtFilter, setDistrictFilter] = useState('');
@@ -61,7 +99,9 @@ export function MapView() {
   const mapRef = useRef<HTMLDivElement>(null);
   const mapInstanceRef = useRef<any>(null);
   const clusterGroupRef = useRef<any>(null);
-  const markersRef = useRef<Map<string, any>>(new Map());
+  const markersRef = useRef<Map<number, any>>(new Map());
+  // Карточки остановок, уже загруженные для попапов
+  const detailsRef = useRef<Map<number, BusStop>>(new Map());
 
   const dm = darkMode;
 
@@ -80,6 +120,11 @@ export function MapView() {
     });
   }, [stops, search, districtFilter, statusFilter, conditionFilter]);
 
+  useEffect(() => {
+    detailsRef.current.clear();
+    loadMapStops();
+  }, [loadMapStops]);
+
   // Инициализация Leaflet
   useEffect(() => {
     const tryInit = () => {
@@ -159,44 +204,25 @@ export function MapView() {
 
     filteredStops.forEach(stop => {
       const color = STATUS_COLORS_MAP[stop.status] || '#3b82f6';
-      const condColor = CONDITION_COLORS_MAP[stop.condition] || '#3b82f6';
 
       const marker = window.L.marker([stop.latitude, stop.longitude], {
         icon: createIcon(color),
       });
 
-      const mainPhoto = (stop.photos || []).find(p => p.is_main) || (stop.photos || [])[0];
-      const photoHtml = mainPhoto
-        ? `<img src="/${mainPhoto.file_path.replace(/\\/g, '/')}" style="width:100%;height:140px;object-fit:cover;border-radius:10px 10px 0 0;display:block;" onerror="this.style.display='none';this.nextElementSibling.style.display='flex'" /><div style="display:none;width:100%;height:140px;background:#f1f5f9;border-radius:10px 10px 0 0;align-items:center;justify-content:center;flex-direction:column;gap:6px;"><svg xmlns='http://www.w3.org/2000/svg' width='40' height='40' viewBox='0 0 24 24' fill='none' stroke='#94a3b8' stroke-width='1.5'><rect x='3' y='3' width='18' height='18' rx='2'/><circle cx='8.5' cy='8.5' r='1.5'/><polyline points='21 15 16 10 5 21'/></svg><span style='font-size:11px;color:#94a3b8;'>Фото недоступно</span></div>`
-        : `<div style="width:100%;height:140px;background:linear-gradient(135deg,#f1f5f9,#e2e8f0);border-radius:10px 10px 0 0;display:flex;align-items:center;justify-content:center;flex-direction:column;gap:8px;"><svg xmlns='http://www.w3.org/2000/svg' width='44' height='44' viewBox='0 0 24 24' fill='none' stroke='#94a3b8' stroke-width='1.5'><path d='M23 19a2 2 0 0 1-2 2H3a2 2 0 0 1-2-2V8a2 2 0 0 1 2-2h4l2-3h6l2 3h4a2 2 0 0 1 2 2z'/><circle cx='12' cy='13' r='4'/></svg><span style='font-size:11px;color:#94a3b8;font-weight:500;'>Нет фотографий</span></div>`;
-      const popupHtml = `
-        <div style="min-width:240px;font-family:system-ui,sans-serif;border-radius:10px;overflow:hidden;">
-          ${photoHtml}
-          <div style="padding:12px;">
-            <div style="display:flex;align-items:center;gap:8px;margin-bottom:8px;">
-              <span style="font-weight:800;font-size:16px;color:#1e293b;">${stop.stop_id}</span>
-              <span style="padding:2px 8px;border-radius:99px;font-size:11px;font-weight:600;background:${color}22;color:${color};border:1px solid ${color}44;">
-                ${STATUS_LABELS[stop.status as StopStatus]}
-              </span>
-            </div>
-            <div style="font-size:13px;color:#475569;margin-bottom:4px;">📍 ${stop.address}</div>
-            <div style="font-size:12px;color:#64748b;margin-bottom:4px;">🏘 ${stop.district}</div>
-            <div style="font-size:12px;color:#64748b;margin-bottom:8px;">🚌 ${stop.routes || '—'}</div>
-            <div style="display:flex;align-items:center;gap:6px;margin-bottom:10px;">
-              <div style="width:8px;height:8px;border-radius:50%;background:${condColor};"></div>
-              <span style="font-size:12px;color:#64748b;">${CONDITION_LABELS[stop.condition as ConditionLevel]}</span>
-            </div>
-            <button onclick="window.openStopCard('${stop.id}')"
-              style="width:100%;padding:9px;background:linear-gradient(135deg,#3b82f6,#6366f1);color:white;border:none;border-radius:8px;cursor:pointer;font-weight:600;font-size:13px;transition:opacity 0.2s;"
-              onmouseover="this.style.opacity='0.85'" onmouseout="this.style.opacity='1'"
-            >Открыть карточку →</button>
-          </div>
-        </div>`;
-
-      marker.bindPopup(popupHtml, {
+      marker.bindPopup(buildPopupHtml(stop, detailsRef.current.get(stop.id)), {
         maxWidth: 280,
         className: 'custom-popup',
       });
+      marker.on('popupopen', async () => {
+        if (detailsRef.current.has(stop.id)) return;
+        try {
+          const details = await getStop(String(stop.id));
+          detailsRef.current.set(stop.id, details);
+          marker.setPopupContent(buildPopupHtml(stop, details));
+        } catch {
+          // попап остаётся с данными карты
+        }
+      });
 
       clusterGroupRef.current.addLayer(marker);
       markersRef.current.set(stop.id, marker);
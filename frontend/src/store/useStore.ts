@@ -5,7 +5,7 @@
 import { create } from 'zustand';
 import { BusStop, User, StopStatus, ConditionLevel } from '../types';
 import { login as apiLogin, logout as apiLogout, getCurrentUser } from '../api/auth';
-import { getAllStops, deleteStop as apiDeleteStop } from '../api/stops';
+import { getAllStops, getMapStops, deleteStop as apiDeleteStop, type MapStop } from '../api/stops';
 import { isAuthenticated, clearTokens } from '../api/client';
 import { getDistrictsPublic, getCustomFieldsPublic, type CustomFieldDto } from '../api/directories';
 import {
@@ -29,6 +29,7 @@ type Page = 'map' | 'list' | 'dashboard' | 'stop-detail' | 'login' | 'admin' | '
 interface AppState {
   currentUser: User | null;
   stops: BusStop[];
+  mapStops: MapStop[];
   users: User[];
   usersTotal: number;
   districts: string[];
@@ -54,6 +55,7 @@ interface AppState {
   toggleDarkMode: () => void;
 
   loadStops: () => Promise<void>;
+  loadMapStops: () => Promise<void>;
   loadDistricts: () => Promise<void>;
   loadCustomFields: () => Promise<void>;
   updateStop: (id: string, updates: Partial<BusStop>) => void;
@@ -72,6 +74,7 @@ const defaultFilters: Filters = { search: '', district: '', status: '', conditio
 export const useStore = create<AppState>((set, get) => ({
   currentUser: null,
   stops: [],
+  mapStops: [],
   users: [],
   usersTotal: 0,
   districts: [],
@@ -111,7 +114,7 @@ export const useStore = create<AppState>((set, get) => ({
   logout: async () => {
     try { await apiLogout(); } finally {
       clearTokens();
-      set({ currentUser: null, currentPage: 'login', selectedStopId: null, stops: [] });
+      set({ currentUser: null, currentPage: 'login', selectedStopId: null, stops: [], mapStops: [] });
     }
   },
 
@@ -139,6 +142,16 @@ export const useStore = create<AppState>((set, get) => ({
     }
   },
 
+  // Маркеры карты: компактный /stops/map (повтор — 304 по ETag)
+  loadMapStops: async () => {
+    try {
+      const mapStops = await getMapStops();
+      set({ mapStops });
+    } catch {
+      // keep existing markers on error
+    }
+  },
+
   loadDistricts: async () => {
     try {
       const data = await getDistrictsPublic();
@@ -183,6 +196,7 @@ export const useStore = create<AppState>((set, get) => ({
       await apiDeleteStop(id);
       set(state => ({
         stops: state.stops.filter(s => s.stop_id !== id && String(s.id) !== id),
+        mapStops: state.mapStops.filter(s => s.stop_id !== id && String(s.id) !== id),
         selectedStopId: null,
       }));
     } catch (err: unknown) {
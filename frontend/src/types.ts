@@ -20,6 +20,7 @@ export interface Photo {
   is_main: boolean;    // FIX: было isMain
   uploaded_at: string; // FIX: было date
   uploader_name?: string; // FIX: было author
+  variants?: Partial<Record<'thumb' | 'medium' | 'thumb_webp' | 'medium_webp', string>>; // URL уменьшенных копий
 }
 
 export interface ChangeLogEntry {
@@ -35,7 +36,7 @@ export interface BusStop {
   id: number;              // FIX: number (не string)
   stop_id: string;         // FIX: было просто id (строка BS-001)
   passport_number?: string; // FIX: было passportNumber
-  qr_code?: string;        // НОВОЕ: QR-код (ТЗ 2.2.3)
+  qr_code?: string;        // УСТАРЕЛО: backend больше не отдаёт, см. getStopQrCode (ТЗ 2.2.3)
 
   address: string;
   landmark?: string;
@@ -0,0 +1,10 @@
+import type { Photo } from '../types';
+
+export type PhotoVariant = 'thumb' | 'medium' | 'thumb_webp' | 'medium_webp';
+
+/**
+ * URL фото: уменьшенная копия, если сервер её отдаёт, иначе оригинал
+ */
+export function photoUrl(photo: Pick<Photo, 'file_path' | 'variants'>, variant?: PhotoVariant): string {
+  return (variant && photo.variants?.[variant]) || `/${photo.file_path.replace(/\\/g, '/')}`;
+}